@@ -0,0 +1,212 @@
+# bench/rerun.py
+"""Per-rerun server cost and payload size.
+
+Runs offline without a browser:
+
+    python bench/rerun.py                    # print a report, check thresholds
+    python bench/rerun.py --json out.json    # also write machine-readable results
+    python bench/rerun.py --apptest          # add full-script reruns via AppTest
+
+Each scenario resolves the game's assets the way the app does (uploads go
+through an UploadStore first), once with a cold cache and then as a
+slider-only rerun. It records wall time, peak
+Python allocations, and the size of the JSON the component sends on every
+rerun, plus the size of the built component page the browser downloads
+once per session. Thresholds live in bench/thresholds.json; any breach makes
+the script exit with status 1.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flappy.assets import build_game_assets  # noqa: E402
+from flappy.build import build_frontend  # noqa: E402
+from flappy.cache import AssetCache  # noqa: E402
+from flappy.catalog import REPO_ASSETS, AssetCatalog  # noqa: E402
+from flappy.serving import StaticAssetStore  # noqa: E402
+from flappy.uploads import UploadStore, store_uploads  # noqa: E402
+
+THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+CONFIG = {"game_speed": 3, "gravity": 0.5, "jump_power": 12, "pipe_gap": 180}
+
+
+class FakeUpload(io.BytesIO):
+    """Enough of streamlit's UploadedFile for the asset pipeline."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.file_id = f"{name}-{len(data)}"
+
+
+def _big_jpeg(size):
+    from PIL import Image
+
+    side = 512
+    while True:
+        img = Image.effect_noise((side, side), 80).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=95)
+        if buf.tell() >= size:
+            return buf.getvalue()
+        side = int(side * 1.4)
+
+
+def scenario_uploads(size):
+    rnd = random.Random(0)
+    image = _big_jpeg(size)
+    audio = rnd.randbytes(size)
+    return {
+        "bg": FakeUpload(image, "bg.jpg"),
+        "player": [FakeUpload(image, "player.jpg")],
+        "pipe": FakeUpload(image, "pipe.jpg"),
+        "bag": FakeUpload(image, "bag.jpg"),
+        "menu": FakeUpload(audio, "menu.mp3"),
+        "ingame": FakeUpload(audio, "ingame.mp3"),
+        "gameover": FakeUpload(audio, "gameover.mp3"),
+    }
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _peak_kb(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def component_html_bytes():
+    # What the browser downloads once per session: the page build_frontend
+    # writes, boot config included
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = build_frontend({"render_mode": "main"}, build_dir=tmp)
+        return os.path.getsize(os.path.join(out_dir, "index.html"))
+
+
+def payload_bytes(assets):
+    return len(json.dumps({"config": CONFIG, "assets": assets, "height": 800}))
+
+
+def run_scenario(uploads, defaults, playlist, mode, repeats):
+    def fresh():
+        tmp = tempfile.TemporaryDirectory()
+        cache = AssetCache()
+        store = StaticAssetStore(os.path.join(tmp.name, "assets")) if mode == "static" else None
+        upload_store = UploadStore(os.path.join(tmp.name, "uploads"))
+        session = {}
+
+        def build():
+            # As stored_uploads in the app: the session keeps upload id -> hash
+            stored, digests, _ = store_uploads(uploads, upload_store, session)
+            session.update(digests)
+            return build_game_assets(stored, defaults, cache, store, None, playlist)
+
+        return tmp, build, cache
+
+    # Allocations are traced on separate passes so they do not skew timings
+    tmp, build, _ = fresh()
+    with tmp:
+        cold_kb = _peak_kb(build)
+        warm_kb = _peak_kb(build)
+    tmp, build, cache = fresh()
+    with tmp:
+        assets, cold_ms = _time(build)
+        warm_ms = min(_time(build)[1] for _ in range(repeats))
+        return {
+            "cold_ms": round(cold_ms, 3),
+            "warm_ms": round(warm_ms, 3),
+            "cold_peak_kb": round(cold_kb, 1),
+            "warm_peak_kb": round(warm_kb, 1),
+            "payload_bytes": payload_bytes(assets),
+            "cache": cache.stats(),
+        }
+
+
+def run_apptest(repeats):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "flappy_streamlit26.py"), default_timeout=120)
+    _, cold_ms = _time(at.run)
+    times = []
+    for i in range(repeats):
+        at.sidebar.slider[0].set_value(1 + i % 10)
+        times.append(_time(at.run)[1])
+    component = next(e for e in at.main if e.type == "component_instance")
+    return {
+        "cold_ms": round(cold_ms, 3),
+        "warm_ms": round(min(times), 3),
+        "payload_bytes": len(component.proto.json_args),
+    }
+
+
+def check(results, thresholds):
+    failures = []
+    for name, limits in thresholds.items():
+        got = results.get(name)
+        if got is None:
+            continue
+        for metric, limit in limits.items():
+            if got.get(metric, 0) > limit:
+                failures.append(f"{name}.{metric} = {got[metric]} > {limit}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--upload-mb", type=float, default=5)
+    parser.add_argument("--apptest", action="store_true", help="also time whole-script reruns")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    uploads = scenario_uploads(int(args.upload_mb * 1024 * 1024))
+    catalog = AssetCatalog(ROOT, REPO_ASSETS, poll_interval=0)
+    defaults, playlist = catalog.defaults(), catalog.playlist()
+    missing = {role: os.path.join("missing", names[0]) for role, names in REPO_ASSETS.items()}
+    results = {}
+    for mode in ("static", "inline"):
+        results[f"defaults/{mode}"] = run_scenario({}, defaults, playlist, mode, args.repeats)
+        results[f"uploads/{mode}"] = run_scenario(uploads, defaults, playlist, mode, args.repeats)
+        results[f"missing/{mode}"] = run_scenario({}, missing, (), mode, args.repeats)
+    if args.apptest:
+        results["apptest/defaults"] = run_apptest(args.repeats)
+
+    with open(THRESHOLDS) as f:
+        thresholds = json.load(f)
+    html_bytes = component_html_bytes()
+    report = {
+        "results": results,
+        "component_html_bytes": html_bytes,
+        "failures": check(dict(results, component={"html_bytes": html_bytes}), thresholds),
+    }
+    for name, r in results.items():
+        print(f"{name:20} cold {r['cold_ms']:9.1f}ms  warm {r['warm_ms']:7.3f}ms  "
+              f"payload {r['payload_bytes']:>9,}B")
+    print(f"{'component':20} built index.html {html_bytes:>9,}B")
+    for failure in report["failures"]:
+        print("REGRESSION:", failure)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
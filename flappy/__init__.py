@@ -0,0 +1,2 @@
+# flappy/__init__.py
+"""Server-side helpers for the Premium Flappy Bird Streamlit app."""
@@ -0,0 +1,292 @@
+# flappy/assets.py
+import base64
+import json
+import os
+
+from flappy import tracing
+from flappy.atlas import build_atlas
+from flappy.audio import TranscodePending, audio_transform
+from flappy.cache import content_hash
+from flappy.images import SCALES, image_transform
+
+MIME_BY_EXT = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "mp3": "audio/mpeg",
+    "m4a": "audio/mp4",
+    "ogg": "audio/ogg",
+    "wav": "audio/wav",
+}
+
+
+def guess_mime(name):
+    ext = name.lower().rsplit(".", 1)[-1]
+    return MIME_BY_EXT.get(ext, "image/png")
+
+
+def _read_upload(fileobj):
+    if hasattr(fileobj, "getvalue"):
+        return fileobj.getvalue()
+    return fileobj.read()
+
+
+def _source_of(fileobj, default):
+    """Describe where an asset comes from, or None when there is nothing to load.
+
+    Returns ``(source_key, mime, read)`` where ``source_key`` identifies the
+    input cheaply (upload id, or path + mtime) and ``read`` fetches the bytes.
+    ``default`` is a path or a catalogued ``flappy.catalog.AssetFile``, whose
+    sniffed type and stat are used as they are.
+    """
+    if fileobj is not None:
+        file_id = getattr(fileobj, "file_id", None)
+        source = ("upload", file_id) if file_id else None
+        return source, guess_mime(fileobj.name), lambda: _read_upload(fileobj)
+
+    if not default:
+        return None
+    if hasattr(default, "mime"):
+        path = default.path
+        source = ("file", path, default.mtime_ns, default.size)
+        mime = default.mime
+    else:
+        path = default
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        source = ("file", path, st.st_mtime_ns, st.st_size)
+        mime = guess_mime(path)
+
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+
+    return source, mime, read
+
+
+def resolve_asset(fileobj, default_path, cache, encode, tag, transform=None, check=None):
+    """Turn an upload or default file into ``encode(raw, mime, digest)``.
+
+    ``transform(raw, mime) -> (raw, mime)`` preprocesses the bytes first (see
+    flappy.images). Results are cached under the *input* digest, so a
+    transform runs once per distinct input; the source alias lets a rerun
+    with unchanged inputs skip reading and hashing entirely. A cached value
+    that fails ``check(value)`` (a published file that has been swept) is
+    encoded again.
+    """
+    if transform is not None:
+        tag = f"{tag}|{transform.tag}"
+    found = _source_of(fileobj, default_path)
+    if found is None:
+        return None
+    source, mime, read = found
+
+    if cache is None:
+        raw = read()
+        tracing.add(bytes=len(raw))
+        return _encode(raw, mime, None, encode, transform)
+
+    # Stored uploads (flappy.uploads) already know their content hash
+    digest = getattr(fileobj, "digest", None)
+    if digest is None and source:
+        digest = cache.lookup_source(source)
+    raw = None
+    if digest is None:
+        raw = read()
+        tracing.add(bytes=len(raw))
+        digest = content_hash(raw)
+        if source:
+            cache.remember_source(source, digest)
+
+    # The one lookup that counts towards the cache's hit rate
+    value = cache.get((digest, mime, tag), check)
+    if value is not None:
+        tracing.add(hits=1)
+        return value
+    if raw is None:
+        raw = read()
+        tracing.add(bytes=len(raw))
+    tracing.add(misses=1)
+    return cache.put((digest, mime, tag), _encode(raw, mime, digest, encode, transform))
+
+
+def _encode(raw, mime, digest, encode, transform):
+    if transform is not None:
+        raw, mime = transform(raw, mime)
+        digest = None
+    return encode(raw, mime, digest or content_hash(raw))
+
+
+def _data_url(raw, mime, digest):
+    return f"data:{mime};base64," + base64.b64encode(raw).decode()
+
+
+def fileobj_to_data_url(fileobj, default_path=None, cache=None, transform=None):
+    return resolve_asset(fileobj, default_path, cache, _data_url, "data", transform)
+
+
+def fileobj_to_asset_url(fileobj, default_path=None, cache=None, store=None, base_url=None,
+                         transform=None):
+    """Publish the asset to ``store`` and return its content-hashed URL.
+
+    Without a store this falls back to an inline data URL.
+    """
+    if store is None:
+        return fileobj_to_data_url(fileobj, default_path, cache, transform)
+    name = resolve_asset(fileobj, default_path, cache, store.publish, "file", transform, store.touch)
+    if name is None:
+        return None
+    return (store.base_url if base_url is None else base_url) + name
+
+
+def _input_digest(fileobj, default, cache):
+    """``(digest, read)`` for one input; the bytes are read only to hash them."""
+    found = _source_of(fileobj, default)
+    if found is None:
+        return None
+    source, _, read_source = found
+
+    def read():
+        raw = read_source()
+        tracing.add(bytes=len(raw))
+        return raw
+
+    digest = getattr(fileobj, "digest", None)
+    if digest is None and source and cache is not None:
+        digest = cache.lookup_source(source)
+    if digest is None:
+        raw = read()
+        digest = content_hash(raw)
+        if source and cache is not None:
+            cache.remember_source(source, digest)
+        read = lambda: raw  # noqa: E731
+    return digest, read
+
+
+# Bump when the atlas layout or frame map changes
+ATLAS_VERSION = 2
+
+
+def atlas_asset(parts, cache=None, store=None, base_url=None, scale=1):
+    """Pack the sprites of ``parts`` into one atlas; returns ``(url, frame_map)``.
+
+    ``parts`` maps "player", "bag" and "pipe" to lists of ``(fileobj,
+    default)`` inputs; the player's list holds one input per upload (see
+    flappy.atlas). Like ``resolve_asset``, the result is cached under the
+    inputs' content hashes, so an unchanged rerun reads nothing.
+    """
+    inputs = {}
+    for role, pairs in parts.items():
+        found = (_input_digest(fileobj, default, cache) for fileobj, default in pairs)
+        inputs[role] = [item for item in found if item is not None]
+    # The default bag falls back to the player art: use the player's frame
+    player_digests = {digest for digest, _ in inputs.get("player", ())}
+    inputs["bag"] = [item for item in inputs.get("bag", ()) if item[0] not in player_digests]
+    if not any(inputs.values()):
+        return None, None
+
+    kind = "data" if store is None else "file"
+    key = (content_hash(json.dumps(
+        {role: [digest for digest, _ in items] for role, items in sorted(inputs.items())}
+    ).encode()), "atlas", f"{kind}|atlas@{scale}x|v{ATLAS_VERSION}")
+    check = None if store is None else (lambda value: store.touch(value[0]))
+    value = cache.get(key, check) if cache is not None else None
+    if value is not None:
+        tracing.add(hits=1)
+    else:
+        raw = {role: [read() for _, read in items] for role, items in inputs.items()}
+        tracing.add(misses=1)
+        packed = build_atlas(
+            raw.get("player", []),
+            bag=(raw.get("bag") or [None])[0],
+            pipe=(raw.get("pipe") or [None])[0],
+            scale=scale,
+        )
+        if packed is None:
+            return None, None
+        data, mime, frame_map = packed
+        encode = _data_url if store is None else store.publish
+        value = (encode(data, mime, content_hash(data)), frame_map)
+        if cache is not None:
+            cache.put(key, value, size=len(value[0]) + len(json.dumps(frame_map)))
+    name, frame_map = value
+    if store is None:
+        return name, frame_map
+    return (store.base_url if base_url is None else base_url) + name, frame_map
+
+
+# Game slots: CONFIG key -> role. Images get a 1x and a @2x variant.
+IMAGE_SLOTS = {"BG_URL": "bg"}
+# Packed into ATLAS_URL, with its frame map in ATLAS
+ATLAS_ROLES = ("player", "bag", "pipe")
+MUSIC_SLOTS = {"MENU_MUSIC_URL": "menu", "INGAME_MUSIC_URL": "ingame", "GAMEOVER_MUSIC_URL": "gameover"}
+SFX_SLOTS = {
+    "SFX_FLAP_URL": "sfx_flap",
+    "SFX_SCORE_URL": "sfx_score",
+    "SFX_COUNTDOWN_URL": "sfx_countdown",
+    "SFX_CRASH_URL": "sfx_crash",
+    "SFX_ENDING_URL": "sfx_ending",
+}
+
+
+def build_game_assets(uploads, defaults, cache=None, store=None, base_url=None, playlist=()):
+    """Resolve every asset the game needs into the dict it receives.
+
+    ``uploads`` and ``defaults`` map roles ("bg", "player", ..., "menu",
+    "ingame", "gameover", "sfx_flap", ...) to uploaded files and fallback
+    paths or catalogued files (see flappy.catalog); the "player" upload may
+    be a list of animation frames. ``playlist`` lists
+    default in-game tracks to play in turn; it needs a ``store``, since the
+    game fetches each track by URL only when it is about to play it. Only
+    the first track is transcoded before this returns (see ``_playlist_url``).
+    """
+    assets = {}
+    for key, role in IMAGE_SLOTS.items():
+        for scale in SCALES:
+            slot = key if scale == 1 else f"{key}@{scale}x"
+            with tracing.span(slot):
+                url = fileobj_to_asset_url(uploads.get(role), defaults.get(role), cache, store, base_url,
+                                           image_transform(role, scale))
+            assets[slot] = url or ""
+    parts = {role: [(uploads.get(role), defaults.get(role))] for role in ATLAS_ROLES}
+    frames = uploads.get("player")
+    if isinstance(frames, (list, tuple)):
+        parts["player"] = [(frame, None) for frame in frames] or [(None, defaults.get("player"))]
+    for scale in SCALES:
+        suffix = "" if scale == 1 else f"@{scale}x"
+        with tracing.span("ATLAS_URL" + suffix):
+            url, frame_map = atlas_asset(parts, cache, store, base_url, scale)
+        assets["ATLAS_URL" + suffix] = url or ""
+        assets["ATLAS" + suffix] = frame_map
+    for key, role in MUSIC_SLOTS.items():
+        with tracing.span(key):
+            assets[key] = fileobj_to_asset_url(uploads.get(role), defaults.get(role), cache, store, base_url,
+                                               audio_transform(role))
+    for key, role in SFX_SLOTS.items():
+        with tracing.span(key):
+            assets[key] = fileobj_to_asset_url(uploads.get(role), defaults.get(role), cache, store, base_url,
+                                               audio_transform("sfx"))
+    # Inline data URLs would put every track in the page; an upload replaces the list
+    tracks = []
+    if store is not None and uploads.get("ingame") is None and len(playlist) > 1:
+        with tracing.span("INGAME_PLAYLIST"):
+            tracks = [_playlist_url(track, i == 0, cache, store, base_url) for i, track in enumerate(playlist)]
+        tracks = [url for url in tracks if url]
+        if tracks:
+            assets["INGAME_MUSIC_URL"] = tracks[0]
+    assets["INGAME_PLAYLIST"] = tracks if len(tracks) > 1 else []
+    return assets
+
+
+def _playlist_url(track, first, cache, store, base_url):
+    # Only the first track holds up the page. The others are transcoded in
+    # the background and published as they are until that is done, so a
+    # later rerun sends the game the transcoded URL.
+    try:
+        return fileobj_to_asset_url(None, track, cache, store, base_url, audio_transform("ingame", wait=first))
+    except TranscodePending:
+        return fileobj_to_asset_url(None, track, cache, store, base_url)
@@ -0,0 +1,122 @@
+# flappy/atlas.py
+"""Sprite atlas for the player, bag and pipe art.
+
+Every sprite, including each frame of an animated player, is fitted to its
+render size (``flappy.images.IMAGE_TARGETS``) and packed into one image with
+a JSON frame map. The game then downloads and decodes a single texture, and
+both the renderer and the game-over pop-ups draw sub-rectangles of it.
+
+A player upload becomes several frames when it is a horizontal strip of
+square frames (a sprite sheet) or when several images are uploaded. The
+frames loop slowly while the player glides ("idle") and play through once,
+quickly, after each flap ("flap").
+"""
+from PIL import Image
+
+from flappy.images import encode_image, load_image, target_box
+
+MAX_FRAMES = 16
+IDLE_FPS = 6
+FLAP_FPS = 18
+# Gutter around each sprite, filled with its edge pixels so scaled draws
+# never blend in a neighbour
+PAD = 1
+MAX_WIDTH = 2048
+
+
+def split_sheet(img):
+    """The frames of a horizontal strip of square frames, or ``[img]``."""
+    side = img.height
+    if side and img.width >= 2 * side and img.width % side == 0:
+        count = min(img.width // side, MAX_FRAMES)
+        return [img.crop((i * side, 0, (i + 1) * side, side)) for i in range(count)]
+    return [img]
+
+
+def fit(img, role, scale=1):
+    box = target_box(role, scale)
+    if img.width > box[0] or img.height > box[1]:
+        img = img.copy()
+        img.thumbnail(box, Image.LANCZOS)
+    return img
+
+
+def pack(sizes, max_width=MAX_WIDTH):
+    """Top-left corners for rectangles of ``sizes``, and the atlas size.
+
+    Tallest first. Each shelf is as tall as its first sprite and shorter
+    sprites stack in columns inside it, so a tall pipe does not leave the
+    space beside it empty.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    width = shelf_y = shelf_h = col_x = col_w = col_y = 0
+    for i in order:
+        w, h = sizes[i][0] + 2 * PAD, sizes[i][1] + 2 * PAD
+        if shelf_h and w <= col_w and col_y + h <= shelf_h:
+            x, y = col_x, shelf_y + col_y
+            col_y += h
+        elif shelf_h and col_x + col_w + w <= max_width:
+            col_x, col_w, col_y = col_x + col_w, w, h
+            x, y = col_x, shelf_y
+        else:
+            shelf_y, shelf_h = shelf_y + shelf_h, h
+            col_x, col_w, col_y = 0, w, h
+            x, y = 0, shelf_y
+        positions[i] = (x + PAD, y + PAD)
+        width = max(width, x + w)
+    return positions, (width, shelf_y + shelf_h)
+
+
+def _paste(atlas, img, x, y):
+    atlas.paste(img, (x, y))
+    w, h = img.size
+    # Extrude the edges into the gutter
+    atlas.paste(img.crop((0, 0, w, 1)), (x, y - 1))
+    atlas.paste(img.crop((0, h - 1, w, h)), (x, y + h))
+    atlas.paste(img.crop((0, 0, 1, h)), (x - 1, y))
+    atlas.paste(img.crop((w - 1, 0, w, h)), (x + w, y))
+
+
+def build_atlas(player, bag=None, pipe=None, scale=1):
+    """Pack the sprites into ``(bytes, mime, frame_map)``, or None if there are none.
+
+    ``player`` is a list of raw images, any of which may be a sprite sheet;
+    ``bag`` and ``pipe`` are raw images or None. Undecodable images are left
+    out. The frame map holds the atlas ``size``, each sprite's ``[x, y, w, h]``
+    under ``frames`` ("player_0", "player_1", ..., "bag", "pipe") and, when
+    there is a player, the ``animations`` as indexes into its frames.
+    """
+    sprites = []
+    frames = []
+    for raw in player:
+        img = load_image(raw)
+        if img is not None:
+            frames.extend(split_sheet(img))
+    for i, img in enumerate(frames[:MAX_FRAMES]):
+        sprites.append((f"player_{i}", fit(img, "player", scale)))
+    for name, raw in (("bag", bag), ("pipe", pipe)):
+        img = load_image(raw, target_box(name, scale)) if raw is not None else None
+        if img is not None:
+            sprites.append((name, fit(img, name, scale)))
+    if not sprites:
+        return None
+
+    positions, size = pack([img.size for _, img in sprites])
+    atlas = Image.new("RGBA", size, (0, 0, 0, 0))
+    rects = {}
+    for (name, img), (x, y) in zip(sprites, positions):
+        _paste(atlas, img.convert("RGBA"), x, y)
+        rects[name] = [x, y, img.width, img.height]
+
+    frame_map = {"size": list(size), "frames": rects}
+    count = min(len(frames), MAX_FRAMES)
+    if count:
+        every = list(range(count))
+        frame_map["animations"] = {
+            "idle": {"frames": every, "fps": IDLE_FPS},
+            "flap": {"frames": every, "fps": FLAP_FPS},
+        }
+    # Lossless: lossy WebP smears colour and alpha across frame borders
+    data, mime = encode_image(atlas, lossless=True)
+    return data, mime, frame_map
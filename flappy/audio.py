@@ -0,0 +1,188 @@
+# flappy/audio.py
+"""Transcode and loudness-normalize game music and sound effects with ffmpeg.
+
+ffmpeg is optional: without it (or with FLAPPY_AUDIO_FORMAT=off) tracks are
+passed through untouched. Results are kept in an on-disk cache keyed by the
+input hash and the encoding settings, so each track is transcoded once and
+survives restarts; transcodes nobody has used lately are swept. Run
+``python -m flappy.audio FILE...`` to fill the cache ahead of time, e.g.
+while building a classroom image.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flappy.cache import content_hash
+from flappy.disk import DiskUsage
+
+log = logging.getLogger(__name__)
+
+AUDIO_FORMAT = os.environ.get("FLAPPY_AUDIO_FORMAT", "ogg")
+AUDIO_BITRATE = os.environ.get("FLAPPY_AUDIO_BITRATE", "64k")
+LOUDNESS_LUFS = float(os.environ.get("FLAPPY_AUDIO_LUFS", "-16"))
+GAMEOVER_MAX_SECONDS = float(os.environ.get("FLAPPY_GAMEOVER_MAX_SECONDS", "15"))
+CACHE_DIR = os.environ.get(
+    "FLAPPY_AUDIO_CACHE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "audio"),
+)
+
+# format -> (ffmpeg codec, container, mime)
+FORMATS = {
+    "ogg": ("libopus", "ogg", "audio/ogg"),
+    "mp3": ("libmp3lame", "mp3", "audio/mpeg"),
+}
+ROLES = ("menu", "ingame", "gameover", "sfx")
+
+FFMPEG = shutil.which("ffmpeg")
+# Old transcodes are swept like uploads (see flappy.disk)
+_usage = DiskUsage(CACHE_DIR)
+
+
+def _filters(role):
+    # Trim leading silence, then trailing silence by trimming a reversed copy.
+    # Sound effects lose all of it so they are heard the moment they fire.
+    keep = 0 if role == "sfx" else 0.1
+    trim = f"silenceremove=start_periods=1:start_threshold=-50dB:start_silence={keep}"
+    chain = [trim, "areverse", trim, "areverse"]
+    if role == "gameover":
+        fade_at = max(GAMEOVER_MAX_SECONDS - 1.5, 0)
+        chain += [f"atrim=0:{GAMEOVER_MAX_SECONDS}", f"afade=t=out:st={fade_at}:d=1.5"]
+    chain.append(f"loudnorm=I={LOUDNESS_LUFS}:TP=-1.5:LRA=11")
+    return ",".join(chain)
+
+
+def _settings_key(role):
+    settings = f"{AUDIO_FORMAT}|{AUDIO_BITRATE}|{_filters(role)}"
+    return hashlib.sha256(settings.encode()).hexdigest()[:12]
+
+
+def enabled():
+    return FFMPEG is not None and AUDIO_FORMAT in FORMATS
+
+
+def _cache_path(raw, role):
+    container = FORMATS[AUDIO_FORMAT][1]
+    return os.path.join(CACHE_DIR, f"{content_hash(raw)}-{_settings_key(role)}.{container}")
+
+
+def transcode_audio(raw, mime, role):
+    """Return ``(bytes, mime)`` for ``raw`` encoded for ``role``."""
+    if not enabled():
+        return raw, mime
+    codec, container, out_mime = FORMATS[AUDIO_FORMAT]
+    cached = _cache_path(raw, role)
+    try:
+        with open(cached, "rb") as f:
+            data = f.read()
+        _usage.touch(cached)
+        return data, out_mime
+    except OSError:
+        pass
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # ffmpeg needs a seekable input for mp4/m4a payloads, so go via temp files
+    with tempfile.TemporaryDirectory(dir=CACHE_DIR) as tmp:
+        src = os.path.join(tmp, "in")
+        dst = os.path.join(tmp, f"out.{container}")
+        with open(src, "wb") as f:
+            f.write(raw)
+        cmd = [
+            FFMPEG, "-hide_banner", "-loglevel", "error", "-y",
+            "-i", src, "-vn", "-map_metadata", "-1",
+            "-af", _filters(role),
+            "-ar", "48000", "-c:a", codec, "-b:a", AUDIO_BITRATE,
+            dst,
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, timeout=120)
+        except (OSError, subprocess.SubprocessError):
+            # Undecodable or exotic input: better to ship the original
+            return raw, mime
+        with open(dst, "rb") as f:
+            data = f.read()
+        os.replace(dst, cached)
+    _usage.used(cached)
+    _usage.maybe_sweep()
+    return data, out_mime
+
+
+class TranscodePending(Exception):
+    """The transcode is running in the background; ask again on a later rerun."""
+
+
+_background = None
+_pending = set()  # cache paths being transcoded in the background
+_failed = set()  # and those ffmpeg could not produce
+_background_lock = threading.Lock()
+
+
+def transcode_later(raw, mime, role):
+    """``transcode_audio`` if its result is cached, else start it in the background.
+
+    Raises ``TranscodePending`` until the transcode is in the cache. Input
+    ffmpeg cannot handle is returned as it is, as ``transcode_audio`` would.
+    """
+    if not enabled():
+        return raw, mime
+    cached = _cache_path(raw, role)
+    global _background
+    with _background_lock:
+        if cached in _failed:
+            return raw, mime
+        ready = cached not in _pending and os.path.exists(cached)
+        if not ready and cached not in _pending:
+            _pending.add(cached)
+            if _background is None:
+                _background = ThreadPoolExecutor(1, thread_name_prefix="flappy-audio")
+            _background.submit(_transcode_in_background, raw, mime, role, cached)
+    if ready:
+        return transcode_audio(raw, mime, role)
+    raise TranscodePending(cached)
+
+
+def _transcode_in_background(raw, mime, role, cached):
+    try:
+        transcode_audio(raw, mime, role)
+    except Exception:
+        log.exception("Background transcode of %s failed", cached)
+    with _background_lock:
+        _pending.discard(cached)
+        if not os.path.exists(cached):
+            _failed.add(cached)
+
+
+def audio_transform(role, wait=True):
+    """Transform for flappy.assets; with ``wait=False`` it may raise ``TranscodePending``."""
+    def transform(raw, mime):
+        if not wait:
+            return transcode_later(raw, mime, role)
+        return transcode_audio(raw, mime, role)
+
+    transform.tag = f"audio:{role}:{AUDIO_FORMAT}:{AUDIO_BITRATE}" if enabled() else "audio:off"
+    return transform
+
+
+def main(argv):
+    if not enabled():
+        print("ffmpeg not found or FLAPPY_AUDIO_FORMAT=off; nothing to do")
+        return 1
+    role = "ingame"
+    for arg in argv:
+        if arg.startswith("--role="):
+            role = arg.split("=", 1)[1]
+            continue
+        with open(arg, "rb") as f:
+            raw = f.read()
+        data, _ = transcode_audio(raw, "audio/mpeg", role)
+        print(f"{arg}: {len(raw)} -> {len(data)} bytes ({role})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,226 @@
+# flappy/build.py
+"""Build the component frontend once per server process.
+
+The game is authored readably in flappy/frontend/index.html. At import time
+flappy.component calls ``build_frontend``, which strips comments and
+indentation (see ``minify``), splices the boot config into the page's single
+injection point, and writes the bundle to a directory named by its content
+hash. Streamlit then serves that directory, so reruns never touch the HTML
+again; all they send is the small JSON args message.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+log = logging.getLogger(__name__)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+BUILD_DIR = os.environ.get(
+    "FLAPPY_BUILD_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "frontend"),
+)
+
+# The one place per-process values enter the page, read by the game as BOOT
+BOOT_TAG = '<script id="bootConfig" type="application/json">'
+
+_SCRIPT = re.compile(r"(<script\b[^>]*>)(.*?)(</script>)", re.S | re.I)
+
+# After these a "/" starts a regex literal rather than a division
+_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+
+
+def _is_block_comment(text):
+    return (text.startswith("/*") and text.endswith("*/")) or (
+        text.startswith("<!--") and text.endswith("-->")
+    )
+
+
+def _minify_markup(html):
+    # Outside scripts: indentation and whole-line comments only
+    lines = []
+    for line in html.splitlines():
+        text = line.strip()
+        if text and not _is_block_comment(text):
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def _regex_allowed(out):
+    # Whether a "/" after the code emitted so far starts a regex literal
+    text = "".join(out[-32:]).rstrip()
+    if not text:
+        return True
+    # Postfix i++ / i-- end an operand: what follows divides
+    if text[-2:] in ("++", "--"):
+        return False
+    if text[-1] in _REGEX_AFTER:
+        return True
+    word = re.search(r"[A-Za-z_$][\w$]*$", text)
+    return bool(word) and word.group() in _REGEX_KEYWORDS
+
+
+def _skip_quoted(code, i, quote):
+    # Index just past the literal that starts at code[i] == quote
+    i += 1
+    while i < len(code) and code[i] != quote:
+        i += 2 if code[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_regex(code, i):
+    i += 1
+    in_class = False
+    while i < len(code) and code[i] != "\n":
+        c = code[i]
+        if c == "\\":
+            i += 1
+        elif c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            return i + 1
+        i += 1
+    raise ValueError("unterminated regex literal")
+
+
+def minify_js(code):
+    """Drop comments, indentation, trailing spaces and blank lines.
+
+    Walks the code token by token, so string, template and regex literals
+    pass through untouched. Line breaks are kept, so automatic semicolon
+    insertion sees exactly the statements it saw before.
+    """
+    out = []
+    # One entry per open template literal: the "{" depth of its ${...}
+    templates = []
+    depth = 0
+    i, n = 0, len(code)
+    line_start = True
+    while i < n:
+        c = code[i]
+        if line_start and c in " \t":
+            i += 1
+            continue
+        line_start = False
+        nxt = code[i + 1] if i + 1 < n else ""
+        if c == "\n":
+            while out and out[-1] in " \t":
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+            line_start = True
+            i += 1
+        elif c == "/" and nxt == "/":
+            while i < n and code[i] != "\n":
+                i += 1
+        elif c == "/" and nxt == "*":
+            close = code.find("*/", i + 2)
+            if close < 0:
+                raise ValueError("unterminated block comment")
+            # Keep a line break (for ASI) or a space (between tokens)
+            if "\n" not in code[i:close]:
+                out.append(" ")
+            elif out and out[-1] != "\n":
+                out.append("\n")
+                line_start = True
+            i = close + 2
+        elif c in "'\"":
+            end = _skip_quoted(code, i, c)
+            out.append(code[i:end])
+            i = end
+        elif c == "`" or (c == "}" and templates and depth == templates[-1]):
+            # The body of a template literal, up to its end or next ${
+            if c == "}":
+                templates.pop()
+                depth -= 1
+            j = i + 1
+            while j < n and code[j] != "`" and code[j:j + 2] != "${":
+                j += 2 if code[j] == "\\" else 1
+            if j >= n:
+                raise ValueError("unterminated template literal")
+            if code[j] == "`":
+                j += 1
+            else:
+                j += 2
+                depth += 1
+                templates.append(depth)
+            out.append(code[i:j])
+            i = j
+        elif c == "/" and _regex_allowed(out):
+            end = _skip_regex(code, i)
+            out.append(code[i:end])
+            i = end
+        else:
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+            out.append(c)
+            i += 1
+    return "".join(out).strip("\n")
+
+
+def minify(html):
+    """Minify the page: scripts with ``minify_js``, markup and styles by line.
+
+    JSON data blocks are left as they are. Outside scripts only indentation,
+    blank lines and lines that are a whole comment are dropped.
+    """
+    parts = []
+    pos = 0
+    for m in _SCRIPT.finditer(html):
+        parts.append(_minify_markup(html[pos:m.start()]))
+        open_tag, body, close_tag = m.groups()
+        if "application/json" not in open_tag:
+            body = minify_js(body)
+            body = f"\n{body}\n" if body else ""
+        parts.append(open_tag + body + close_tag)
+        pos = m.end()
+    parts.append(_minify_markup(html[pos:]))
+    return "\n".join(part for part in parts if part) + "\n"
+
+
+def boot_json(boot):
+    """Serialize ``boot`` so it cannot close or break out of its script tag."""
+    text = json.dumps(boot, separators=(",", ":"), sort_keys=True)
+    return text.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+
+def render_page(source, boot):
+    start = source.index(BOOT_TAG) + len(BOOT_TAG)
+    end = source.index("</script>", start)
+    return source[:start] + boot_json(boot) + source[end:]
+
+
+def build_frontend(boot, source_dir=FRONTEND_DIR, build_dir=BUILD_DIR):
+    """Return a directory holding the built ``index.html`` for ``boot``.
+
+    Builds are immutable and shared: a second process with the same source
+    and boot config reuses the directory. If the build directory is not
+    writable the readable source is served instead, without the boot config.
+    """
+    with open(os.path.join(source_dir, "index.html"), encoding="utf-8") as f:
+        page = render_page(minify(f.read()), boot)
+    data = page.encode("utf-8")
+    out_dir = os.path.join(build_dir, hashlib.sha256(data).hexdigest()[:16])
+    target = os.path.join(out_dir, "index.html")
+    if os.path.exists(target):
+        return out_dir
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+    except OSError as exc:
+        log.warning("Could not write the frontend build to %s (%s); serving the source", out_dir, exc)
+        return source_dir
+    return out_dir
@@ -0,0 +1,94 @@
+# flappy/cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Memory budget for encoded assets, shared by every session in the process.
+DEFAULT_BUDGET_MB = int(os.environ.get("FLAPPY_ASSET_CACHE_MB", "128"))
+
+
+def content_hash(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+class AssetCache:
+    """LRU cache of encoded assets with a byte budget.
+
+    Entries are keyed by ``(content_hash, kind)`` so identical bytes uploaded by
+    different sessions share one entry. A second, much smaller map remembers
+    which content hash a source (an upload id or a file path + mtime) resolved
+    to, so a rerun with unchanged inputs never reads or hashes the bytes again.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, check=None):
+        """The value cached under ``key``, or None.
+
+        A value that fails ``check(value)`` (say, a published file that has
+        been swept) counts as a miss. Call once per lookup: every call counts.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        # Outside the lock: check may touch the disk
+        hit = entry is not None and (check is None or check(entry[0]))
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[0] if hit else None
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = len(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.used_bytes -= old[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted
+                self.evictions += 1
+        return value
+
+    # Source -> content hash aliases
+    def lookup_source(self, source):
+        with self._lock:
+            digest = self._sources.get(source)
+            if digest is not None:
+                self._sources.move_to_end(source)
+            return digest
+
+    def remember_source(self, source, digest):
+        with self._lock:
+            self._sources[source] = digest
+            self._sources.move_to_end(source)
+            while len(self._sources) > 4096:
+                self._sources.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
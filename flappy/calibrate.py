@@ -0,0 +1,583 @@
+# flappy/calibrate.py
+"""Difficulty calibration sweep over the sidebar's settings.
+
+Plays every combination of speed, gravity, jump power and pipe gap
+headlessly (flappy.sim) with a planning bot, and writes one row per
+combination: how often the bot survives the whole run, its median survival
+time, its score distribution and whether any flap timing gets through a
+pipe at all (``crossing_search``, run where the bot never clears one).
+
+    python -m flappy.calibrate                       # all cores, default grid
+    python -m flappy.calibrate --runs 64 --jobs 4    # more runs, fewer cores
+
+Work is split into one task per (speed, gravity) pair and spread over a
+process pool. Finished tasks are appended to a checkpoint next to the
+output, so an interrupted sweep picks up where it stopped. The app reads
+the table (``load_table``) to offer Easy/Normal/Hard presets and to warn
+about settings with no way through.
+"""
+import argparse
+import bisect
+import csv
+import gzip
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+
+import numpy as np
+
+from flappy.replay import CONFIG_LIMITS, MAX_WORLD
+from flappy.sim import (
+    FLOOR_MARGIN, FRAME_MS, PIPE_SPEED_SCALE, PIPE_WIDTH_RATIO, PLAYER_SIZE, PLAYER_X, GameBatch, pipe_capacity,
+)
+
+log = logging.getLogger(__name__)
+
+TABLE_PATH = os.environ.get(
+    "FLAPPY_CALIBRATION",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration.csv.gz"),
+)
+
+# Grid steps in config codes (gravity is in hundredths)
+STEPS = {"game_speed": 1, "gravity": 10, "jump_power": 1, "pipe_gap": 10}
+RUNS = 32
+SECONDS = 60
+# Bump when the bot or the search changes, so old checkpoints are not resumed
+VERSION = 3
+SCALE = FRAME_MS / 16
+# The bot plans its way into a pipe from this many frames out, tries first
+# flaps up to FIRST_FLAP frames out when one flap is not enough, and after
+# finding no plan waits RETRY frames before the next try
+LOOKAHEAD = 64
+FIRST_FLAP = 32
+RETRY = 16
+# Pipes checked at once (at speed 1 three can overlap the player's path)
+NEARBY = 3
+# Clearance (px) the bot keeps under the top of a gap narrower than a flap's rise
+MIN_MARGIN = 2
+# The pipe search starts this many frames before the pipe reaches the
+# player, and merges games closer than this in height (px) and speed (px/frame)
+SEARCH_LEAD = 40
+SEARCH_Y = 4
+SEARCH_VY = 0.2
+
+Row = namedtuple("Row", "game_speed gravity jump_power pipe_gap clear survival score_p10 score_p50 score_p90 "
+                        "crossable")
+COLUMNS = Row._fields
+
+
+def grid_values(param, step):
+    low, high = CONFIG_LIMITS[param]
+    values = list(range(low, high + 1, step))
+    if values[-1] != high:
+        values.append(high)
+    return values
+
+
+def unwinnable(row):
+    """True if no flap timing gets the player through a single pipe."""
+    return not row.crossable
+
+
+# A pipe as seen from the player: the heights the player's top edge may take
+# while they overlap (top..low) and the frames from now on that they do
+Window = namedtuple("Window", "top low enter leave")
+FAR = 1e9  # stands in for "no pipe" in a Window
+
+
+def _arc(y, v, gravity, i):
+    """Height ``i`` frames after (y, v) with no flap; ``gravity`` is per frame."""
+    return y + SCALE * (v * i + gravity * i * (i + 1) / 2)
+
+
+def _drops_below(y, v, gravity, line, start):
+    """First frame from ``start`` on at which the arc from (y, v) is below ``line`` for good."""
+    a = SCALE * gravity / 2
+    b = SCALE * (v + gravity / 2)
+    disc = b * b - 4 * a * (y - line)
+    root = (-b + np.sqrt(np.maximum(disc, 0))) / (2 * a)
+    return np.where(disc < 0, start, np.maximum(np.floor(root) + 1, start))
+
+
+def _ceiling_frame(y, v, gravity):
+    """First frame at which the arc from (y, v) would leave the top of the canvas, or inf."""
+    a = SCALE * gravity / 2
+    b = SCALE * (v + gravity / 2)
+    disc = b * b - 4 * a * y
+    root = np.sqrt(np.maximum(disc, 0))
+    first = np.floor(np.maximum((-b - root) / (2 * a), 0)) + 1
+    return np.where((disc > 0) & (first < (-b + root) / (2 * a)), first, np.inf)
+
+
+def _stays_in(y, v, gravity, first, last, top, low):
+    """Whether the arc from (y, v) keeps within top..low from frame ``first`` to ``last``."""
+    a = SCALE * gravity / 2
+    b = SCALE * (v + gravity / 2)
+    start = y + first * (b + a * first)
+    end = y + last * (b + a * last)
+    vertex = -b / (2 * a)
+    highest = np.where((vertex > first) & (vertex < last), y - b * b / (4 * a), np.minimum(start, end))
+    return (last < first) | ((highest >= top) & (np.maximum(start, end) <= low))
+
+
+def _coast(y, v, start, end, pipes, target, gravity, floor):
+    """Coast from (y, v) at frame ``start`` to ``end``, short of the target pipe.
+
+    Returns whether that is safe and the height at ``end``. Bumping into the
+    ceiling stops the player dead, so the arc starts over from rest there.
+    """
+    frames = end - start
+    bump = _ceiling_frame(y, v, gravity)
+    free = np.minimum(frames, bump - 1)
+    bumped = bump <= frames
+    bump = np.where(bumped, bump, frames)
+    rest = np.zeros_like(y * frames)
+    ok = _stays_in(y, v, gravity, 1, free, -FAR, floor)
+    ok &= ~bumped | _stays_in(rest, rest, gravity, 0, frames - bump, -FAR, floor)
+    for pipe in pipes:
+        ok &= _stays_in(y, v, gravity, np.maximum(pipe.enter - start, 1), np.minimum(free, pipe.leave - start),
+                        pipe.top, pipe.low)
+        ok &= ~bumped | _stays_in(rest, rest, gravity, np.maximum(pipe.enter - start - bump, 0),
+                                  np.minimum(frames - bump, pipe.leave - start - bump), pipe.top, pipe.low)
+    y_end = np.where(bumped, _arc(rest, rest, gravity, frames - bump), _arc(y, v, gravity, frames))
+    return ok & (end < target.enter), y_end
+
+
+def _gets_through(y, v, start, pipes, target, line, gravity, jump, rise, floor):
+    """Whether a game at (y, v) at frame ``start`` gets through ``target``.
+
+    It coasts into the pipe and then flaps whenever it would drop below
+    ``line``: the first flap inside is followed until it falls back to the
+    line, and any after that need room in the gap for a whole rise.
+    """
+    ok = _stays_in(y, v, gravity, 1, target.enter - start - 1, 0, floor)
+    first = np.maximum(target.enter - start, 1)
+    flap = np.where(_arc(y, v, gravity, first) > line, first, _drops_below(y, v, gravity, line, first))
+    flap_y = _arc(y, v, gravity, flap - 1)
+    left = target.leave - start - flap + 1
+    back = _drops_below(flap_y, -jump, gravity, line, 1)
+    arc = np.minimum(left, np.maximum(back - 1, 1))
+    offset = start + flap - 1
+    for pipe in pipes:
+        ok &= _stays_in(y, v, gravity, np.maximum(pipe.enter - start, 1), np.minimum(pipe.leave - start, flap - 1),
+                        pipe.top, pipe.low)
+        ok &= _stays_in(flap_y, -jump, gravity, np.maximum(pipe.enter - offset, 1),
+                        np.minimum(pipe.leave - offset, arc), pipe.top, pipe.low)
+    return ok & ((left < 1) | (back > left) | (line - rise >= target.top))
+
+
+def _middle(ok):
+    """Whether any of ``ok`` holds along its last axis, and the middle of the first run that does."""
+    first = ok.argmax(axis=-1)
+    after = (np.arange(ok.shape[-1]) >= first[..., None]) & ~ok
+    end = np.where(after.any(axis=-1), after.argmax(axis=-1), ok.shape[-1])
+    return ok.any(axis=-1), (first + end - 1) // 2
+
+
+def _aim(pipe, rise, floor):
+    """Height to flap at before ``pipe``: centres the flap's arc in the gap, or
+    peaks just under its top if the gap is narrower than a rise."""
+    return np.minimum(pipe.top + np.maximum((pipe.low - pipe.top - rise) / 2, MIN_MARGIN) + rise, floor)
+
+
+class PlanningBot:
+    """Flap policy that plans its way through each pipe on the flap arc.
+
+    Called by ``GameBatch.run`` once a frame. Each game aims for the gap's
+    centre: outside a pipe it flaps at ``_aim``, inside one at the lower of
+    that and the bottom of the gap (the hold line). Once the next pipe is
+    within LOOKAHEAD frames it looks for a way in, in this order: coasting
+    straight in, one flap, or two flaps, each followed by flapping at the
+    hold line all the way through. Plans are checked against every pipe
+    overlapping the player on the way (they crowd together at low speed),
+    the floor and the ceiling, all in closed form on the flap arc. A game
+    sticks to its plan until it enters the pipe; with none it keeps flapping
+    at the hold line and searches again after RETRY frames.
+    """
+
+    def __init__(self, n):
+        self.flaps = np.full((n, 2), -1, dtype=np.int64)  # planned flap frames, -1 for none
+        self.hold = np.full(n, -1, dtype=np.int64)  # follow the plan until this frame
+        self.retry = np.full(n, -1, dtype=np.int64)  # no search before this frame
+
+    def __call__(self, batch):
+        mask = np.zeros(batch.n, dtype=bool)
+        r = np.flatnonzero(batch.alive)
+        if not r.size:
+            return mask
+        frame = batch.frames[r]
+        flaps = self.flaps[r]
+        mask[r] = (flaps == frame[:, None]).any(axis=1)
+        free = r[~(flaps >= frame[:, None]).any(axis=1) & (self.hold[r] <= frame)]
+        if free.size:
+            mask[free] = self._decide(batch, free)
+        return mask
+
+    def _windows(self, batch, r):
+        """The NEARBY pipes ahead of games ``r`` as Windows, nearest first."""
+        width = batch.pipe_width[r][:, None]
+        ahead = np.where(batch.pipe_x[r] + width > PLAYER_X, batch.pipe_x[r], np.inf)
+        order = np.argsort(ahead, axis=1)[:, :NEARBY]
+        x = np.take_along_axis(ahead, order, axis=1)
+        center = np.take_along_axis(batch.pipe_center[r], order, axis=1)
+        seen = np.isfinite(x)
+        half_gap = batch.pipe_gap[r][:, None] / 2
+        pipe_speed = (batch.game_speed[r] * PIPE_SPEED_SCALE * SCALE)[:, None]
+        x = np.where(seen, x, FAR)
+        windows = Window(
+            top=np.where(seen, center - half_gap, -FAR),
+            low=np.where(seen, center + half_gap - PLAYER_SIZE, FAR),
+            enter=np.floor((x - PLAYER_X - PLAYER_SIZE) / pipe_speed) + 1,
+            leave=np.where(seen, np.ceil((x + width - PLAYER_X) / pipe_speed) - 1, -FAR),
+        )
+        return [Window._make(field[:, k] for field in windows) for k in range(order.shape[1])]
+
+    def _decide(self, batch, r):
+        gravity = batch.gravity[r] * SCALE
+        jump = -batch.jump_power[r]
+        climb = np.floor(jump / gravity)  # frames a flap keeps rising
+        rise = SCALE * (climb * jump - gravity * climb * (climb + 1) / 2)
+        floor = batch.height[r] - FLOOR_MARGIN - PLAYER_SIZE
+        y, vy = batch.y[r], batch.vy[r]
+        pipes = self._windows(batch, r)
+        # The target is the first pipe the player is not in yet
+        target = pipes[-1]
+        for pipe in reversed(pipes[:-1]):
+            target = Window._make(np.where(pipe.enter >= 2, a, b) for a, b in zip(pipe, target))
+        aim = _aim(target, rise, floor)
+        line = np.minimum(aim, target.low)
+        hold = floor
+        for pipe in pipes:
+            hold = np.where(pipe.enter <= 1, np.minimum(hold, np.minimum(_aim(pipe, rise, floor), pipe.low)), hold)
+        coast = _arc(y, vy, gravity, 1)
+        mask = coast > np.where(pipes[0].enter <= 1, hold, aim)
+
+        frame = batch.frames[r]
+        near = np.flatnonzero((target.enter <= LOOKAHEAD) & (self.retry[r] <= frame))
+        if not near.size:
+            return mask
+        column = lambda values: values[near, None]
+        pipes = [Window._make(map(column, pipe)) for pipe in pipes if (pipe.enter[near] <= target.leave[near]).any()]
+        target = Window._make(map(column, target))
+        y, vy, line, gravity, jump, rise, floor = map(column, (y, vy, line, gravity, jump, rise, floor))
+        now = np.zeros_like(y)
+        straight = _gets_through(y, vy, now, pipes, target, line, gravity, jump, rise, floor)[:, 0]
+        later = np.arange(LOOKAHEAD)[None, :].astype(float)
+        ok, flap_y = _coast(y, vy, now, later, pipes, target, gravity, floor)
+        one, one_at = _middle(ok & _gets_through(flap_y, -jump, later, pipes, target, line, gravity, jump, rise, floor))
+        one &= ~straight
+        two = np.zeros(near.size, dtype=bool)
+        two_at = np.zeros((near.size, 2), dtype=np.int64)
+        rest = np.flatnonzero(~straight & ~one)
+        if rest.size:
+            two[rest], two_at[rest] = self._two_flaps(
+                *(values[rest] for values in (y, vy, line, gravity, jump, rise, floor)),
+                [Window._make(field[rest] for field in pipe) for pipe in pipes],
+                Window._make(field[rest] for field in target))
+
+        flaps = np.full((near.size, 2), -1, dtype=np.int64)
+        flaps[one, 0] = one_at[one]
+        flaps[two] = two_at[two]
+        planned = straight | one | two
+        rows, start = r[near], frame[near]
+        self.flaps[rows] = np.where(flaps >= 0, flaps + start[:, None], -1)
+        self.hold[rows] = np.where(planned, start + target.enter[:, 0] - 1, -1)
+        self.retry[rows] = np.where(planned, -1, start + RETRY)
+        mask[near] = np.where(planned, flaps[:, 0] == 0, mask[near])
+        return mask
+
+    def _two_flaps(self, y, vy, line, gravity, jump, rise, floor, pipes, target):
+        """Plans that flap twice before the target pipe: found, and their two frames."""
+        column = lambda values: values[:, :, None]
+        pipes = [Window._make(map(column, pipe)) for pipe in pipes]
+        target = Window._make(map(column, target))
+        y, vy, line, gravity, jump, rise, floor = map(column, (y, vy, line, gravity, jump, rise, floor))
+        first = np.arange(FIRST_FLAP)[None, :, None].astype(float)
+        second = first + 1 + np.arange(LOOKAHEAD)[None, None, :]
+        ok, first_y = _coast(y, vy, np.zeros_like(y), first, pipes, target, gravity, floor)
+        ok2, second_y = _coast(first_y, -jump, first, second, pipes, target, gravity, floor)
+        ok = ok & ok2 & _gets_through(second_y, -jump, second, pipes, target, line, gravity, jump, rise, floor)
+        found, i = _middle(ok.any(axis=2))
+        _, j = _middle(ok[np.arange(len(i)), i])
+        return found, np.stack([i, i + 1 + j], axis=1)
+
+
+def crossing_search(speed, gravity, combos, width=MAX_WORLD[0], height=MAX_WORLD[1]):
+    """Which ``(jump, gap)`` combos some flap timing gets through one pipe.
+
+    Branches on flap or no flap every frame, starting from a column of
+    heights shortly before the pipe until it has been passed. After each
+    frame, games of the same combo in about the same place at about the same
+    speed are merged, which keeps the search to a few hundred thousand
+    games; a way through that needs sub-pixel timing may be missed.
+    """
+    pipe_speed = speed * PIPE_SPEED_SCALE * SCALE
+    frames = SEARCH_LEAD + math.ceil((width * PIPE_WIDTH_RATIO + PLAYER_SIZE) / pipe_speed) + 2
+    starts = [
+        (i, jump, gap, y)
+        for i, (jump, gap) in enumerate(combos)
+        for y in np.arange((height - gap) / 2 - 2 * SEARCH_LEAD, (height + gap) / 2 - PLAYER_SIZE + 1, 2)
+    ]
+    combo, jumps, gaps, ys = (np.array(column) for column in zip(*starts))
+    combo = combo.astype(np.int64)
+    batch = GameBatch(len(ys), width, height, speed, gravity / 100, jumps, gaps, capacity=1)
+    batch.y = ys.astype(np.float64)
+    batch.pipe_timer[:] = -np.inf  # just the one pipe
+    batch.pipe_x[:, 0] = PLAYER_X + PLAYER_SIZE + SEARCH_LEAD * pipe_speed
+    batch.pipe_center[:, 0] = height / 2
+    batch.pipe_scored[:, 0] = False
+
+    for _ in range(frames):
+        both = np.repeat(np.arange(batch.n), 2)
+        batch.take(both)
+        combo = combo[both]
+        # Every game goes on both without and with a flap
+        batch.step(FRAME_MS, np.arange(batch.n) % 2 == 1)
+        live = np.flatnonzero(batch.alive)
+        cell = (combo[live] * 1000 + np.round(batch.y[live] / SEARCH_Y).astype(np.int64)) * 10000
+        cell += np.round(batch.vy[live] / SEARCH_VY).astype(np.int64) + 5000
+        keep = live[np.unique(cell, return_index=True)[1]]
+        batch.take(keep)
+        combo = combo[keep]
+        if not batch.n:
+            break
+    through = np.zeros(len(combos), dtype=bool)
+    through[combo[batch.score > 0]] = True
+    return through
+
+
+def run_task(task):
+    """Rows for every jump power and gap at one (speed, gravity) pair."""
+    speed, gravity, params = task
+    jumps = grid_values("jump_power", params["steps"]["jump_power"])
+    gaps = grid_values("pipe_gap", params["steps"]["pipe_gap"])
+    combos = [(jump, gap) for jump in jumps for gap in gaps]
+    runs = params["runs"]
+    # Every combination sees the same pipe layouts, so rows compare fairly
+    seeds = np.random.default_rng(params["seed"]).integers(0, 2**32, size=runs, dtype=np.uint32)
+
+    n = len(combos) * runs
+    batch = GameBatch(
+        n,
+        width=params["width"],
+        height=params["height"],
+        game_speed=speed,
+        gravity=gravity / 100,
+        jump_power=np.repeat([jump for jump, _ in combos], runs),
+        pipe_gap=np.repeat([gap for _, gap in combos], runs),
+        seed=np.tile(seeds, len(combos)),
+        capacity=pipe_capacity(params["width"], speed),
+    )
+    max_frames = params["seconds"] * 60
+    batch.run(PlanningBot(n), max_frames=max_frames)
+
+    frames = batch.frames.reshape(len(combos), runs)
+    scores = batch.score.reshape(len(combos), runs)
+    # Where the bot never clears a pipe, search for any way through one
+    through = scores.max(axis=1) > 0
+    stuck = np.flatnonzero(~through)
+    if stuck.size:
+        through[stuck] = crossing_search(speed, gravity, [combos[i] for i in stuck],
+                                         params["width"], params["height"])
+    rows = []
+    for i, (jump, gap) in enumerate(combos):
+        p10, p50, p90 = np.percentile(scores[i], [10, 50, 90])
+        rows.append(Row(
+            speed, gravity, jump, gap,
+            round(float((frames[i] >= max_frames).mean()), 3),
+            round(float(np.median(frames[i])) / 60, 1),
+            int(p10), int(p50), int(p90), int(through[i]),
+        ))
+    return speed, gravity, rows
+
+
+def _read_checkpoint(path, params):
+    done = {}
+    try:
+        with open(path) as f:
+            header = json.loads(f.readline() or "null")
+            if not header or header.get("params") != params:
+                log.warning("Checkpoint %s is from a different sweep; starting over", path)
+                return {}
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn last line from an interrupted write
+                done[tuple(entry["task"])] = [Row(*row) for row in entry["rows"]]
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def write_table(path, rows, params):
+    tmp = path + ".tmp"
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(tmp, "wt", newline="") as f:
+        f.write("# " + json.dumps(params, sort_keys=True) + "\n")
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(sorted(rows))
+    os.replace(tmp, path)
+
+
+def sweep(out, params, jobs=None):
+    checkpoint = out + ".ckpt"
+    done = _read_checkpoint(checkpoint, params)
+    tasks = [
+        (speed, gravity, params)
+        for speed in grid_values("game_speed", params["steps"]["game_speed"])
+        for gravity in grid_values("gravity", params["steps"]["gravity"])
+        if (speed, gravity) not in done
+    ]
+    total = len(done) + len(tasks)
+    if done:
+        print(f"Resuming: {len(done)}/{total} tasks already done", file=sys.stderr)
+
+    fresh = not done
+    with open(checkpoint, "w" if fresh else "a") as f:
+        if fresh:
+            f.write(json.dumps({"params": params}) + "\n")
+            f.flush()
+        start = time.monotonic()
+        with Pool(jobs) as pool:
+            for speed, gravity, rows in pool.imap_unordered(run_task, tasks):
+                done[(speed, gravity)] = rows
+                f.write(json.dumps({"task": [speed, gravity], "rows": rows}) + "\n")
+                f.flush()
+                print(f"{len(done)}/{total} tasks, {time.monotonic() - start:.0f}s", file=sys.stderr)
+
+    rows = [row for task_rows in done.values() for row in task_rows]
+    write_table(out, rows, params)
+    os.unlink(checkpoint)
+    return rows
+
+
+def load_table(path=TABLE_PATH):
+    """The sweep's rows as a ``Calibration``, or None if there is no table."""
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", newline="") as f:
+            lines = (line for line in f if not line.startswith("#"))
+            reader = csv.reader(lines)
+            next(reader)
+            rows = [Row(*(float(v) if "." in v else int(v) for v in row)) for row in reader]
+    except (OSError, StopIteration, ValueError, TypeError) as exc:
+        log.info("No calibration table at %s (%s)", path, exc)
+        return None
+    return Calibration(rows)
+
+
+# Share of full-length bot runs that makes a preset. The bot clears the
+# defaults every time, so Hard is where even it crashes now and then
+PRESETS = {"Easy": (0.95, 1.0), "Normal": (0.75, 1.0), "Hard": (0.25, 0.75)}
+DEFAULT_CONFIG = (3, 50, 12, 180)
+
+
+class Calibration:
+    def __init__(self, rows):
+        self.rows = {row[:4]: row for row in rows}
+        self.values = [sorted({key[i] for key in self.rows}) for i in range(4)]
+        self._presets = {}
+
+    def corners(self, config_key):
+        """Rows at the corners of the grid cell holding ``config_key``.
+
+        A coordinate on a grid line contributes just that value. None if
+        ``config_key`` is outside the grid or the sweep skipped a corner.
+        """
+        around = []
+        for values, x in zip(self.values, config_key):
+            if not values or not values[0] <= x <= values[-1]:
+                return None
+            i = bisect.bisect_left(values, x)
+            around.append((x,) if values[i] == x else (values[i - 1], values[i]))
+        rows = [self.rows.get(key) for key in itertools.product(*around)]
+        return None if None in rows else rows
+
+    def _distance(self, key, origin):
+        return sum(
+            abs(a - b) / ((high - low) or 1)
+            for a, b, (low, high) in zip(key, origin, CONFIG_LIMITS.values())
+        )
+
+    def _closest(self, keys, origin):
+        return min(keys, key=lambda key: self._distance(key, origin), default=None)
+
+    def presets(self, origin=DEFAULT_CONFIG):
+        """Preset name -> config key, easiest first.
+
+        Normal is the row in its band closest to ``origin``. Easy is the row
+        in its band closest to Normal that is slower, has a wider gap and
+        clears at least as often; Hard the one that is faster, has a narrower
+        gap and clears at most as often. Each step up is then a step up both
+        in the bot's clear rate and in the settings the player sees.
+        """
+        presets = self._presets.get(origin)
+        if presets is None:
+            band = {
+                name: [key for key, row in self.rows.items() if low <= row.clear <= high]
+                for name, (low, high) in PRESETS.items()
+            }
+            normal = self._closest(band["Normal"], origin)
+            presets = self._presets[origin] = {}
+            if normal is None:
+                return presets
+            clear = self.rows[normal].clear
+            easier = [key for key in band["Easy"] if key[0] < normal[0] and key[3] > normal[3]
+                      and self.rows[key].clear >= clear]
+            harder = [key for key in band["Hard"] if key[0] > normal[0] and key[3] < normal[3]
+                      and self.rows[key].clear <= clear]
+            for name, key in (("Easy", self._closest(easier, normal)), ("Normal", normal),
+                              ("Hard", self._closest(harder, normal))):
+                if key is not None:
+                    presets[name] = key
+        return presets
+
+    def impossible(self, config_key):
+        """Whether no flap timing gets through a pipe at ``config_key``.
+
+        Between grid points that holds only if it holds at every corner of
+        the cell around it. None if the table does not cover ``config_key``.
+        """
+        rows = self.corners(config_key)
+        if rows is None:
+            return None
+        return all(unwinnable(row) for row in rows)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default=TABLE_PATH, help="table to write (.csv or .csv.gz)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--runs", type=int, default=RUNS, help="games per combination")
+    parser.add_argument("--seconds", type=int, default=SECONDS, help="longest game to play")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gravity-step", type=int, default=STEPS["gravity"], help="in hundredths")
+    parser.add_argument("--gap-step", type=int, default=STEPS["pipe_gap"])
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    params = {
+        "version": VERSION,
+        "runs": args.runs,
+        "seconds": args.seconds,
+        "seed": args.seed,
+        "width": MAX_WORLD[0],
+        "height": MAX_WORLD[1],
+        "steps": dict(STEPS, gravity=args.gravity_step, pipe_gap=args.gap_step),
+    }
+    rows = sweep(args.out, params, args.jobs)
+    impossible = sum(unwinnable(row) for row in rows)
+    print(f"Wrote {len(rows)} combinations to {args.out} ({impossible} with no way through a pipe)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,206 @@
+# flappy/catalog.py
+"""Catalog of the default assets shipped next to the app.
+
+The project directory is scanned once at startup. Each file's real format is
+sniffed from its first bytes instead of trusted from its extension, and
+empty, truncated or undecodable files are left out. Roles are then matched to
+the first valid file among their candidate names, so a misnamed track
+(``ingame_music_2.mp000``) or one without an extension still resolves.
+
+A background thread re-stats the files in the directory every
+``poll_interval`` seconds and rebuilds the catalog only when an mtime or size
+changed, so a rerun reads the defaults from memory without touching the disk.
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+POLL_SECONDS = float(os.environ.get("FLAPPY_CATALOG_POLL_SECONDS", "5"))
+
+# A default asset as the pipeline sees it (see flappy.assets._source_of)
+AssetFile = namedtuple("AssetFile", "path name mime size mtime_ns")
+
+# File mappings: role -> candidate files in order of preference. Names match
+# with or without their extension; the real format is sniffed (see ``sniff``).
+# Shared by the app and bench/rerun.py
+REPO_ASSETS = {
+    "bg": ["background_image.png"],
+    "player": ["player_character.png"],
+    "pipe": ["obstacle_enemy.png"],
+    "bag": ["bag.png", "player_character.png"],  # Fallback to player image
+    "menu": ["Home Screen Music (Only on Menu Screen).mp3"],
+    "ingame": ["ingame_music_1.mp3", "ingame_music_3.mp3", "ingame_music_4.mp3"],
+    "gameover": ["ingame_music_2.mp3", "ingame_music_4.mp3"],
+    "sfx_flap": ["random effect used in game.mp3", "random effect.mp3"],
+    "sfx_score": ["6 to 10 point effect.mp3"],
+    "sfx_countdown": ["game starting effect.mp3", "starting effect.mp3"],
+    "sfx_crash": ["0 to 5 elimination effect.mp3"],
+    "sfx_ending": ["ending effect.mp3"],
+    # In-game playlist: every valid track, in order
+    "playlist": [f"ingame_music_{i}.mp3" for i in range(1, 6)],
+}
+
+SNIFF_BYTES = 64
+# Anything smaller cannot hold a real image or a second of audio
+MIN_BYTES = 256
+
+
+def sniff(head):
+    """Mime type from a file's first bytes, or None if it is not a known asset."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head[4:8] == b"ftyp":
+        return "audio/mp4"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    return None
+
+
+def _id3_size(head):
+    # ID3v2 tag size: four 7-bit bytes after the 6-byte header, plus the header
+    return 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+
+
+def check_asset(path, head, mime, size):
+    """True if the file looks like a complete asset of type ``mime``."""
+    if size < MIN_BYTES:
+        return False
+    if mime.startswith("image/"):
+        try:
+            from PIL import Image
+
+            with Image.open(path) as img:
+                img.verify()
+        except ImportError:
+            return True
+        except Exception:
+            return False
+        return True
+    if mime == "audio/mpeg" and head.startswith(b"ID3"):
+        # Cover art and tags only, no audio frames after them
+        return _id3_size(head) + MIN_BYTES <= size
+    return True
+
+
+class AssetCatalog:
+    def __init__(self, root, candidates, poll_interval=POLL_SECONDS):
+        """``candidates`` maps each role to file names in order of preference.
+
+        Names match with or without their extension. A ``poll_interval`` of
+        0 disables the background refresh.
+        """
+        self.root = root
+        self.candidates = candidates
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._files = {}
+        self._defaults = {}
+        self._matches = {}
+        self._stamp = None
+        self.refresh()
+        if poll_interval:
+            threading.Thread(target=self._watch, name="flappy-catalog", daemon=True).start()
+
+    def defaults(self):
+        """Role -> AssetFile (or None) for the current scan; no filesystem access."""
+        return self._defaults
+
+    def matches(self, role):
+        """Every valid candidate for ``role``, in order of preference."""
+        return self._matches.get(role, [])
+
+    def playlist(self):
+        """The in-game playlist: every valid "playlist" track except the one
+        that already plays on the game-over screen."""
+        gameover = self._defaults.get("gameover")
+        return [track for track in self.matches("playlist") if track != gameover]
+
+    def refresh(self):
+        """Rescan if anything changed since the last scan; True if it did."""
+        stamp = self._stat_stamp()
+        if stamp == self._stamp:
+            return False
+        with self._lock:
+            files = self._scan()
+            self._files = files
+            self._matches = self._resolve(files)
+            self._defaults = {role: (found[0] if found else None) for role, found in self._matches.items()}
+            self._stamp = self._stat_stamp()
+        missing = sorted(role for role, found in self._defaults.items() if found is None)
+        if missing:
+            log.warning("No valid default asset for: %s", ", ".join(missing))
+        return True
+
+    def _stat_stamp(self):
+        # Name, mtime and size of every file: catches added, removed and
+        # renamed files as well as edits in place
+        try:
+            with os.scandir(self.root) as entries:
+                return frozenset(
+                    (e.name, st.st_mtime_ns, st.st_size)
+                    for e in entries
+                    if not e.name.startswith(".") and e.is_file()
+                    for st in (e.stat(),)
+                )
+        except OSError:
+            return None
+
+    def _scan(self):
+        files = {}
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return files
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+                old = self._files.get(entry.name)
+                if old is not None and (old.mtime_ns, old.size) == (st.st_mtime_ns, st.st_size):
+                    files[entry.name] = old
+                    continue
+                with open(entry.path, "rb") as f:
+                    head = f.read(SNIFF_BYTES)
+            except OSError:
+                continue
+            mime = sniff(head)
+            if mime is None:
+                continue
+            if not check_asset(entry.path, head, mime, st.st_size):
+                log.info("Skipping empty or corrupt asset %s", entry.name)
+                continue
+            files[entry.name] = AssetFile(entry.path, entry.name, mime, st.st_size, st.st_mtime_ns)
+        return files
+
+    def _resolve(self, files):
+        by_stem = {}
+        for name, asset in sorted(files.items()):
+            by_stem.setdefault(os.path.splitext(name)[0], asset)
+        matches = {}
+        for role, names in self.candidates.items():
+            found = (files.get(name) or by_stem.get(os.path.splitext(name)[0]) for name in names)
+            matches[role] = [asset for asset in found if asset is not None]
+        return matches
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh()
+            except Exception:
+                log.exception("Asset catalog refresh failed")
@@ -0,0 +1,61 @@
+# flappy/component.py
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from flappy.build import build_frontend
+
+# Where the game loop runs:
+#   "main"   - on the component iframe's main thread (the default)
+#   "worker" - in a Web Worker drawing to an OffscreenCanvas, so host page
+#              work cannot stall frames; browsers without OffscreenCanvas
+#              fall back to "main"
+RENDER_MODE = os.environ.get("FLAPPY_RENDER_MODE", "main")
+
+# Built once per process; reruns only send the JSON args below
+_flappy_game = components.declare_component("flappy_game", path=build_frontend({"render_mode": RENDER_MODE}))
+
+
+def flappy_game(config, assets, height=800, ack=None, key="flappy_game"):
+    """Render the game and keep it alive across reruns.
+
+    The iframe is created once. Later reruns only post ``config`` and
+    ``assets`` to it, and the game applies slider changes live and reloads
+    just the assets whose URL changed. ``ack`` tells the game which of its
+    messages have been handled (see ``pending_messages``).
+    """
+    return _flappy_game(config=config, assets=assets, height=height, ack=ack, key=key, default=None)
+
+
+def pending_messages(key="flappy_game"):
+    """Messages the game sent that this session has not handled yet.
+
+    Returns ``(messages, ack)``. Handle the messages, then call
+    ``acknowledge(ack)`` and pass ``ack`` to the next ``flappy_game`` call so
+    the game can drop them from its outbox. Until then they are offered
+    again, so a rerun that fails half way through loses nothing.
+    """
+    value = st.session_state.get(key)
+    if not isinstance(value, dict):
+        # Whatever the browser sent, it is not a message list
+        value = {}
+    last = st.session_state.get(f"{key}_ack") or {}
+    instance = value.get("instance")
+    messages = value.get("messages")
+    messages = [m for m in messages if isinstance(m, dict)] if isinstance(messages, list) else []
+    seen = last.get("seq", 0) if last.get("instance") == instance else 0
+
+    fresh = [m for m in messages if _seq(m) > seen]
+    ack = {"instance": instance, "seq": max([seen] + [_seq(m) for m in messages])}
+    return fresh, ack
+
+
+def _seq(message):
+    seq = message.get("seq")
+    return seq if isinstance(seq, (int, float)) and not isinstance(seq, bool) else 0
+
+
+def acknowledge(ack, key="flappy_game"):
+    """Record that the messages covered by ``ack`` have been handled."""
+    st.session_state[f"{key}_ack"] = ack
@@ -0,0 +1,99 @@
+# flappy/disk.py
+"""Age and size limits for the app's directories of files.
+
+Uploads (flappy.uploads), published assets (flappy.serving) and transcoded
+audio (flappy.audio) all grow with every new file a class uploads. Each
+directory gets a ``DiskUsage``: callers ``touch`` a file whenever they hand
+it out, and a periodic ``sweep`` deletes files nobody has used for
+``max_age`` seconds, then the least recently used ones until the directory
+fits in ``max_bytes``. Every swept file can be rebuilt from its source, so
+a reader that finds its file gone simply writes it again. Hidden files
+(``.gitkeep``) are left alone, except for temp files (``.tmp-*``) left
+behind by an interrupted write.
+"""
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+MAX_AGE_HOURS = float(os.environ.get("FLAPPY_CACHE_MAX_AGE_HOURS", "24"))
+MAX_MB = float(os.environ.get("FLAPPY_CACHE_MAX_MB", "1024"))
+
+# Refresh a file's mtime at most this often while it stays in use
+TOUCH_INTERVAL = 600
+SWEEP_INTERVAL = 3600
+
+
+class DiskUsage:
+    def __init__(self, root, max_age=MAX_AGE_HOURS * 3600, max_bytes=MAX_MB * 1024 * 1024,
+                 sweep_interval=SWEEP_INTERVAL):
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def used(self, path):
+        """Record that ``path`` was just written (its mtime is fresh)."""
+        with self._lock:
+            self._touched[path] = time.time()
+
+    def touch(self, path):
+        """Mark ``path`` as in use; False if it no longer exists."""
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(path, 0) < TOUCH_INTERVAL:
+                return True
+        try:
+            os.utime(path)
+        except OSError:
+            return False
+        with self._lock:
+            self._touched[path] = now
+        return True
+
+    def forget(self, path):
+        with self._lock:
+            self._touched.pop(path, None)
+
+    def maybe_sweep(self):
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+
+    def sweep(self):
+        """Delete stale files, then the oldest until under ``max_bytes``."""
+        self._last_sweep = now = time.time()
+        cutoff = now - self.max_age
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith(".") and not name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                with self._lock:
+                    last = max(stat.st_mtime, self._touched.get(path, 0))
+                files.append((last, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for last, size, path in files:
+            if last >= cutoff and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            self.forget(path)
+        if removed:
+            log.info("Removed %d unused files from %s", removed, self.root)
+        return removed
@@ -0,0 +1,99 @@
+# flappy/images.py
+import io
+
+from PIL import Image, ImageOps, features
+
+# Largest size (CSS px) each image is ever drawn at in the game:
+#   bg     - stretched over the canvas, which is capped at 900x600
+#   player - 50x50 in flight, 100x100 in the game-over pop-up
+#   pipe   - 8% of the canvas width, up to the full canvas height
+#   bag    - 80x80 game-over pop-up
+IMAGE_TARGETS = {
+    "bg": (900, 600),
+    "player": (100, 100),
+    "pipe": (72, 600),
+    "bag": (80, 80),
+}
+SCALES = (1, 2)
+
+HAS_WEBP = features.check("webp")
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def target_box(role, scale=1):
+    box_w, box_h = IMAGE_TARGETS[role]
+    return box_w * scale, box_h * scale
+
+
+def load_image(raw, box=None):
+    """Decode ``raw`` upright as RGB or RGBA, or return None if Pillow cannot.
+
+    ``box`` lets the JPEG decoder skip detail that is about to be thrown away.
+    """
+    try:
+        img = Image.open(io.BytesIO(raw))
+        if box is not None:
+            img.draft("RGB", box)
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    except Exception:
+        return None
+    return img.convert("RGBA" if _has_alpha(img) else "RGB")
+
+
+def encode_image(img, lossless=False):
+    """``(bytes, mime)`` for ``img``: WebP where Pillow has it, else PNG or JPEG.
+
+    ``lossless`` keeps every pixel (lossless WebP, else PNG).
+    """
+    out = io.BytesIO()
+    if HAS_WEBP:
+        if lossless:
+            img.save(out, "WEBP", lossless=True, method=6)
+        else:
+            img.save(out, "WEBP", quality=85, method=4)
+        mime = "image/webp"
+    elif img.mode == "RGBA" or lossless:
+        img.save(out, "PNG", optimize=True)
+        mime = "image/png"
+    else:
+        img.save(out, "JPEG", quality=85, optimize=True, progressive=True)
+        mime = "image/jpeg"
+    return out.getvalue(), mime
+
+
+def prepare_image(raw, mime, role, scale=1):
+    """Downscale ``raw`` to the render size of ``role`` and re-encode it.
+
+    Returns ``(bytes, mime)``. Metadata (EXIF, ICC, text chunks) is dropped.
+    Images that Pillow cannot read are passed through unchanged so the game
+    still gets whatever the user uploaded.
+    """
+    box = target_box(role, scale)
+    img = load_image(raw, box)
+    if img is None:
+        return raw, mime
+
+    resized = img.width > box[0] or img.height > box[1]
+    if resized:
+        img.thumbnail(box, Image.LANCZOS)
+
+    data, out_mime = encode_image(img)
+    # Tiny sprites can come out bigger than a well-compressed original; the
+    # original still carries its metadata, so try a lossless copy instead
+    if not resized and len(data) >= len(raw):
+        lossless = encode_image(img, lossless=True)
+        if len(lossless[0]) < len(data):
+            data, out_mime = lossless
+    return data, out_mime
+
+
+def image_transform(role, scale=1):
+    def transform(raw, mime):
+        return prepare_image(raw, mime, role, scale)
+
+    transform.tag = f"{role}@{scale}x"
+    return transform
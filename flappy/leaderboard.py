@@ -0,0 +1,226 @@
+# flappy/leaderboard.py
+"""Shared leaderboard stored in SQLite.
+
+Scores are queued and written in batches by a background thread (WAL mode,
+one transaction per batch). Top-N lists per game config and per-player
+bests are served from memory and updated as scores come in, so a read on
+every Streamlit rerun is a dict lookup. A cold read merges the table with
+the scores still queued instead of waiting for the writer.
+
+Each run is stored with a digest of its log under a UNIQUE constraint, so a
+verified log only ever ranks once, whoever submits it.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+Entry = namedtuple("Entry", "player score steps created")
+
+# (game_speed, gravity in hundredths, jump_power, pipe_gap)
+ConfigKey = namedtuple("ConfigKey", "game_speed gravity jump_power pipe_gap")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    game_speed INTEGER NOT NULL,
+    gravity INTEGER NOT NULL,
+    jump_power INTEGER NOT NULL,
+    pipe_gap INTEGER NOT NULL,
+    created REAL NOT NULL,
+    log_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_config
+    ON runs (game_speed, gravity, jump_power, pipe_gap, score DESC, created);
+CREATE INDEX IF NOT EXISTS runs_by_player
+    ON runs (player, score DESC);
+"""
+
+# Tables created before runs carried a log digest get the column on open;
+# older rows keep NULL, which UNIQUE allows any number of
+MIGRATIONS = """
+CREATE UNIQUE INDEX IF NOT EXISTS runs_by_log ON runs (log_hash);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class Leaderboard:
+    def __init__(self, path, top_n=10, batch_size=64, flush_interval=1.0):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._reader = _connect(path)
+        self._reader.executescript(SCHEMA)
+        columns = [row[1] for row in self._reader.execute("PRAGMA table_info(runs)")]
+        if "log_hash" not in columns:
+            self._reader.execute("ALTER TABLE runs ADD COLUMN log_hash TEXT")
+        self._reader.executescript(MIGRATIONS)
+        self._read_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._top = {}
+        self._best = {}
+        self._version = 0
+        # Submitted but not yet committed, by log hash: (entry, config)
+        self._unwritten = {}
+
+        self._queue = queue.Queue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        threading.Thread(target=self._writer, name="flappy-leaderboard", daemon=True).start()
+
+    # Writes
+    def submit(self, player, score, steps, config, digest):
+        """Queue a run; False if the run with log hash ``digest`` is already in."""
+        config = ConfigKey(*config)
+        entry = Entry(player, int(score), int(steps), time.time())
+        with self._cache_lock:
+            if digest in self._unwritten:
+                return False
+        with self._read_lock:
+            if self._reader.execute("SELECT 1 FROM runs WHERE log_hash = ?", (digest,)).fetchone():
+                return False
+        with self._cache_lock:
+            # Re-check: another session may have queued it meanwhile
+            if digest in self._unwritten:
+                return False
+            self._unwritten[digest] = (entry, config)
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((entry, config, digest))
+        self._remember(entry, config)
+        return True
+
+    def flush(self, timeout=5.0):
+        """Block until every submitted score is on disk."""
+        with self._flushed:
+            self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def _writer(self):
+        conn = _connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            written = False
+            try:
+                with conn:
+                    conn.execute("BEGIN")
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO runs (player, score, steps, game_speed, gravity,"
+                        " jump_power, pipe_gap, created, log_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(e.player, e.score, e.steps, *c, e.created, h) for e, c, h in batch],
+                    )
+                written = True
+            except sqlite3.Error:
+                log.exception("dropped %d leaderboard entries", len(batch))
+            finally:
+                # Committed (or dropped): reads go to the table from here on
+                with self._cache_lock:
+                    for _, _, digest in batch:
+                        self._unwritten.pop(digest, None)
+                    if not written:
+                        self._forget(batch)
+                with self._flushed:
+                    self._pending -= len(batch)
+                    self._flushed.notify_all()
+
+    # Reads
+    def top(self, config):
+        """Best ``top_n`` entries for a config, highest score first."""
+        config = ConfigKey(*config)
+        with self._cache_lock:
+            cached = self._top.get(config)
+            version = self._version
+        if cached is not None:
+            return cached
+        queued, rows = self._query(
+            "SELECT log_hash, player, score, steps, created FROM runs"
+            " WHERE game_speed = ? AND gravity = ? AND jump_power = ? AND pipe_gap = ?"
+            " ORDER BY score DESC, created LIMIT ?",
+            (*config, self.top_n),
+        )
+        entries = {digest: entry for digest, (entry, c) in queued.items() if c == config}
+        for i, (digest, *row) in enumerate(rows):
+            # Rows from before log hashes have none to match on
+            entries[digest or i] = Entry(*row)
+        entries = sorted(entries.values(), key=lambda e: (-e.score, e.created))[: self.top_n]
+        with self._cache_lock:
+            # Only cache if no score arrived while we were reading
+            if self._version == version:
+                self._top[config] = entries
+        return entries
+
+    def player_best(self, player):
+        with self._cache_lock:
+            if player in self._best:
+                return self._best[player]
+            version = self._version
+        queued, rows = self._query("SELECT MAX(score) FROM runs WHERE player = ?", (player,))
+        scores = [entry.score for entry, _ in queued.values() if entry.player == player]
+        if rows[0][0] is not None:
+            scores.append(rows[0][0])
+        best = max(scores, default=None)
+        with self._cache_lock:
+            if self._version == version:
+                self._best[player] = best
+        return best
+
+    def _query(self, sql, params):
+        """The queued runs by log hash, and the rows of ``sql``.
+
+        The queue is copied first: the writer drops a run from it only after
+        committing, so every run shows up in one or both (callers dedupe by
+        hash) without waiting for the writer's batch window.
+        """
+        with self._cache_lock:
+            queued = dict(self._unwritten)
+        with self._read_lock:
+            return queued, self._reader.execute(sql, params).fetchall()
+
+    def _forget(self, batch):
+        """Drop the cached reads a failed ``batch`` may show; hold ``_cache_lock``.
+
+        The version bump keeps reads that started before the failure, with
+        the batch still queued, from caching what they found.
+        """
+        self._version += 1
+        for entry, config, _ in batch:
+            self._top.pop(config, None)
+            self._best.pop(entry.player, None)
+
+    def _remember(self, entry, config):
+        with self._cache_lock:
+            self._version += 1
+            top = self._top.get(config)
+            if top is not None and (len(top) < self.top_n or entry.score > top[-1].score):
+                top = sorted(top + [entry], key=lambda e: (-e.score, e.created))[: self.top_n]
+                self._top[config] = top
+            if entry.player in self._best:
+                best = self._best[entry.player]
+                if best is None or entry.score > best:
+                    self._best[entry.player] = entry.score
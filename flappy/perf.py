@@ -0,0 +1,138 @@
+# flappy/perf.py
+"""Frame-time statistics reported by the game, aggregated across sessions.
+
+The game records the rAF interval and the time spent in update and render
+into fixed-size histograms (see ``PERF_BINS`` in the frontend), closes one
+every 30 s of play, on a config change and at the end of each run, and
+sends the batch along with the next run submission. Histograms are merged
+per profile (the config each report was played at, custom assets and render
+mode), so percentiles over all sessions stay exact to one bin.
+"""
+import threading
+from collections import OrderedDict
+
+# name -> (bin width in ms, number of bins); must match PERF_BINS in index.html
+BINS = {"frame": (0.5, 200), "update": (0.1, 250), "render": (0.1, 250)}
+
+MAX_PROFILES = 64
+# Session ids remembered per profile to tell new sessions from repeat
+# reports; a session forgotten and heard from again counts twice
+MAX_SESSIONS = 256
+
+
+def _count(value, limit=10**9):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0
+    return int(min(max(value, 0), limit))
+
+
+class Histogram:
+    def __init__(self, bin_ms, size):
+        self.bin_ms = bin_ms
+        self.counts = [0] * size
+        self.over = 0
+        self.max = 0.0
+
+    @property
+    def total(self):
+        return sum(self.counts) + self.over
+
+    def merge(self, data):
+        """Add a histogram posted by the game; False if it does not fit."""
+        if not isinstance(data, dict) or data.get("bin") != self.bin_ms:
+            return False
+        counts = data.get("counts")
+        if not isinstance(counts, list) or len(counts) > len(self.counts):
+            return False
+        for i, n in enumerate(counts):
+            self.counts[i] += _count(n)
+        self.over += _count(data.get("over"))
+        self.max = max(self.max, float(_count(data.get("max"), 60_000)))
+        return True
+
+    def percentile(self, p):
+        """Upper edge of the bin holding the ``p``-th percentile, in ms."""
+        total = self.total
+        if not total:
+            return None
+        rank = p / 100 * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return round((i + 1) * self.bin_ms, 1)
+        return round(self.max, 1)
+
+
+class Profile:
+    def __init__(self):
+        self.hist = {name: Histogram(*spec) for name, spec in BINS.items()}
+        self.sessions = 0
+        self.recent = OrderedDict()  # session id -> None, least recent first
+        self.frames = 0
+        self.dropped = 0
+        self.heap = 0
+
+    def seen(self, session):
+        if session in self.recent:
+            self.recent.move_to_end(session)
+            return
+        self.sessions += 1
+        self.recent[session] = None
+        if len(self.recent) > MAX_SESSIONS:
+            self.recent.popitem(last=False)
+
+
+class PerfStats:
+    """Thread-safe, process-wide aggregate of the game's perf reports."""
+
+    def __init__(self, max_profiles=MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile, summary):
+        """Merge one report from the game; malformed reports are ignored."""
+        if not isinstance(summary, dict) or not isinstance(summary.get("hist"), dict):
+            return False
+        key = profile + (str(summary.get("mode") or "main"),)
+        with self._lock:
+            entry = self._profiles.get(key)
+            if entry is None:
+                entry = self._profiles[key] = Profile()
+                while len(self._profiles) > self.max_profiles:
+                    self._profiles.popitem(last=False)
+            self._profiles.move_to_end(key)
+            for name, hist in entry.hist.items():
+                hist.merge(summary["hist"].get(name))
+            entry.frames += _count(summary.get("frames"))
+            entry.dropped += _count(summary.get("dropped"))
+            entry.heap = max(entry.heap, _count(summary.get("heap"), 2**40))
+            session = summary.get("session")
+            if isinstance(session, str):
+                entry.seen(session[:32])
+        return True
+
+    def rows(self):
+        """``(profile, stats)`` pairs, most recently reported first."""
+        rows = []
+        # Under the lock: add() changes the histograms in place
+        with self._lock:
+            for key, entry in reversed(self._profiles.items()):
+                rows.append((key, self._stats(entry)))
+        return rows
+
+    @staticmethod
+    def _stats(entry):
+        frame = entry.hist["frame"]
+        return {
+            "sessions": entry.sessions,
+            "frames": entry.frames,
+            "frame_p50": frame.percentile(50),
+            "frame_p95": frame.percentile(95),
+            "frame_p99": frame.percentile(99),
+            "update_p95": entry.hist["update"].percentile(95),
+            "render_p95": entry.hist["render"].percentile(95),
+            "dropped_pct": round(100 * entry.dropped / max(entry.frames + entry.dropped, 1), 1),
+            "heap_mb": round(entry.heap / 2**20, 1) if entry.heap else None,
+        }
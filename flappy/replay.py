@@ -0,0 +1,371 @@
+# flappy/replay.py
+"""Decode run logs written by the game and verify claimed scores.
+
+A log is a few bytes of header (seed, world size, starting config) and one
+varint per input event: ``delta_steps * 2 + kind``, where kind 0 is a flap
+and kind 1 a mid-run config change followed by a parameter index and value.
+``verify_runs`` replays a whole batch of logs through flappy.sim at once,
+or a single one in plain Python (``replay_one``), which skips numpy's
+per-step overhead.
+"""
+import base64
+import binascii
+import hashlib
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from flappy.sim import (
+    FLOOR_MARGIN, FRAME_MS, MARGIN_RATIO, PIPE_INTERVAL_MS, PIPE_SPAWN_OFFSET, PIPE_SPEED_SCALE, PIPE_WIDTH_RATIO,
+    PLAYER_SIZE, PLAYER_X, GameBatch, pipe_capacity,
+)
+
+LOG_VERSION = 1
+EVENT_FLAP = 0
+EVENT_CONFIG = 1
+# Same order as CONFIG_PARAMS in the game; values are integer codes
+CONFIG_PARAMS = ("game_speed", "gravity", "jump_power", "pipe_gap")
+CONFIG_LIMITS = {
+    "game_speed": (1, 10),
+    "gravity": (10, 100),  # hundredths
+    "jump_power": (5, 20),
+    "pipe_gap": (120, 250),
+}
+MAX_WORLD = (900, 600)
+MAX_STEPS = 60 * 60 * 30  # half an hour of play
+
+RunLog = namedtuple("RunLog", "seed width height config steps events")
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def config_value(param, code):
+    """Physics value for an integer config code (gravity is in hundredths)."""
+    return code / 100 if param == "gravity" else code
+
+
+def config_code(param, value):
+    return round(value * 100) if param == "gravity" else int(value)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def u8(self):
+        if self.pos >= len(self.data):
+            raise ReplayError("truncated log")
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def uint(self, size):
+        return sum(self.u8() << (8 * i) for i in range(size))
+
+    def varint(self):
+        value = shift = 0
+        while True:
+            byte = self.u8()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+            if shift > 63:
+                raise ReplayError("varint too long")
+
+
+def _check_config(param, code):
+    low, high = CONFIG_LIMITS[param]
+    if not low <= code <= high:
+        raise ReplayError(f"{param} out of range: {code}")
+
+
+def decode_log(data):
+    """Parse a log (bytes or base64 text) into a RunLog."""
+    if not isinstance(data, (str, bytes, bytearray)):
+        raise ReplayError(f"log is {type(data).__name__}, not text or bytes")
+    if isinstance(data, str):
+        try:
+            data = base64.b64decode(data, validate=True)
+        except binascii.Error as exc:
+            raise ReplayError("log is not valid base64") from exc
+    r = _Reader(data)
+    if r.u8() != LOG_VERSION:
+        raise ReplayError("unsupported log version")
+    seed, width, height = r.uint(4), r.uint(2), r.uint(2)
+    if not (0 < width <= MAX_WORLD[0] and 0 < height <= MAX_WORLD[1]):
+        raise ReplayError("world size out of range")
+    config = tuple(r.varint() for _ in CONFIG_PARAMS)
+    for param, code in zip(CONFIG_PARAMS, config):
+        _check_config(param, code)
+    steps = r.varint()
+    if not 0 < steps <= MAX_STEPS:
+        raise ReplayError("run length out of range")
+
+    events = []
+    step = 0
+    for _ in range(r.varint()):
+        word = r.varint()
+        step += word >> 1
+        if step >= steps:
+            raise ReplayError("event after the end of the run")
+        if word & 1 == EVENT_CONFIG:
+            param = r.u8()
+            if param >= len(CONFIG_PARAMS):
+                raise ReplayError("unknown config parameter")
+            code = r.varint()
+            _check_config(CONFIG_PARAMS[param], code)
+            events.append((step, EVENT_CONFIG, param, code))
+        else:
+            events.append((step, EVENT_FLAP, 0, 0))
+    if r.pos != len(data):
+        raise ReplayError("trailing bytes after log")
+    return RunLog(seed, width, height, config, steps, events)
+
+
+def encode_log(log):
+    """Inverse of decode_log; returns base64 text like the game does."""
+    out = bytearray([LOG_VERSION])
+    out += log.seed.to_bytes(4, "little")
+    out += log.width.to_bytes(2, "little") + log.height.to_bytes(2, "little")
+
+    def varint(v):
+        while v >= 0x80:
+            out.append((v & 0x7F) | 0x80)
+            v >>= 7
+        out.append(v)
+
+    for code in log.config:
+        varint(code)
+    varint(log.steps)
+    varint(len(log.events))
+    last = 0
+    for step, kind, param, code in log.events:
+        varint((step - last) * 2 + kind)
+        last = step
+        if kind == EVENT_CONFIG:
+            out.append(param)
+            varint(code)
+    return base64.b64encode(bytes(out)).decode()
+
+
+def log_digest(log):
+    """Hex digest of a decoded log's canonical encoding.
+
+    Two submissions of the same run hash alike even if their base64 or
+    varints were written differently.
+    """
+    return hashlib.sha256(encode_log(log).encode()).hexdigest()
+
+
+def replay_logs(logs):
+    """Replay decoded logs side by side.
+
+    Returns ``(scores, frames, alive)`` arrays: the score reached, the number
+    of steps each game was alive for, and whether it was still alive after
+    its last logged step.
+    """
+    n = len(logs)
+    configs = np.array([log.config for log in logs], dtype=np.float64).reshape(n, len(CONFIG_PARAMS))
+    batch = GameBatch(
+        n,
+        width=[log.width for log in logs],
+        height=[log.height for log in logs],
+        game_speed=configs[:, 0],
+        gravity=configs[:, 1] / 100,
+        jump_power=configs[:, 2],
+        pipe_gap=configs[:, 3],
+        seed=np.array([log.seed for log in logs], dtype=np.uint32),
+        # speed can drop mid-run, so size the pipe ring for the slowest setting
+        capacity=pipe_capacity(MAX_WORLD[0], CONFIG_LIMITS["game_speed"][0]),
+    )
+    steps = np.array([log.steps for log in logs], dtype=np.int64)
+
+    # Flatten every event into step-sorted arrays so each step is one slice
+    ev = [(step, game, kind, param, code)
+          for game, log in enumerate(logs) for step, kind, param, code in log.events]
+    ev.sort(key=lambda e: (e[0], e[2] == EVENT_FLAP))
+    ev = np.array(ev, dtype=np.int64).reshape(-1, 5)
+    bounds = np.searchsorted(ev[:, 0], np.arange(steps.max() + 2)) if n else []
+
+    attrs = {0: "game_speed", 1: "gravity", 2: "jump_power", 3: "pipe_gap"}
+    flap = np.zeros(n, dtype=bool)
+    outlived = np.zeros(n, dtype=bool)
+    for t in range(int(steps.max()) + 1 if n else 0):
+        # Stop each game at its logged length, dead or not
+        over = batch.alive & (t >= steps)
+        outlived |= over
+        batch.alive &= ~over
+        if not batch.alive.any():
+            break
+        flap[:] = False
+        lo, hi = bounds[t], bounds[t + 1]
+        for _, game, kind, param, code in ev[lo:hi]:
+            if kind == EVENT_FLAP:
+                flap[game] = True
+            elif param == 2:
+                batch.jump_power[game] = -code
+            else:
+                getattr(batch, attrs[param])[game] = config_value(CONFIG_PARAMS[param], code)
+        batch.step(FRAME_MS, flap)
+    return batch.score, batch.frames, outlived
+
+
+def read_run(message):
+    """``(RunLog, score)`` from a run message the game sent.
+
+    Raises ReplayError if the message is not an object, its log does not
+    decode, its score is not a non-negative integer or its seed is not the
+    one in the log.
+    """
+    if not isinstance(message, dict):
+        raise ReplayError("run message is not an object")
+    log = decode_log(message.get("log"))
+    score = message.get("score")
+    if type(score) is not int or score < 0:
+        raise ReplayError(f"score is not a count: {score!r}")
+    seed = message.get("seed")
+    if type(seed) is not int or seed != log.seed:
+        raise ReplayError(f"seed does not match the log: {seed!r}")
+    return log, score
+
+
+def read_config(codes):
+    """Config tuple from the integer codes the game sent, in CONFIG_PARAMS order.
+
+    Raises ReplayError unless ``codes`` is a list of in-range integers.
+    """
+    if not isinstance(codes, list) or len(codes) != len(CONFIG_PARAMS):
+        raise ReplayError("config is not a list of codes")
+    for param, code in zip(CONFIG_PARAMS, codes):
+        if type(code) is not int:
+            raise ReplayError(f"{param} is not an integer: {code!r}")
+        _check_config(param, code)
+    return tuple(codes)
+
+
+def max_steps(log, score):
+    """Most steps a run that scored ``score`` can have lasted.
+
+    Pipes spawn one interval apart. The first one also has to cross the
+    whole world, and a player who outlives a pipe scores it, so each point
+    buys at most one more interval. A mid-run slow-down stretches the
+    intervals by up to the ratio of the fastest and slowest speeds.
+    """
+    speeds = [log.config[0]] + [code for _, kind, param, code in log.events if kind == EVENT_CONFIG and param == 0]
+    slowest, fastest = min(speeds), max(speeds)
+    interval = math.ceil(PIPE_INTERVAL_MS / FRAME_MS) + 1
+    pipe_speed = slowest * PIPE_SPEED_SCALE * FRAME_MS / 16
+    crossing = math.ceil((log.width * (1 + PIPE_WIDTH_RATIO) + PIPE_SPAWN_OFFSET - PLAYER_X) / pipe_speed)
+    return interval + crossing + (score + 1) * math.ceil(interval * fastest / slowest)
+
+
+def _random(state):
+    """Scalar ``mulberry32``: returns ``(value, next_state)``."""
+    a = (state + 0x6D2B79F5) & 0xFFFFFFFF
+    t = ((a ^ (a >> 15)) * (a | 1)) & 0xFFFFFFFF
+    t ^= (t + ((t ^ (t >> 7)) * (t | 61) & 0xFFFFFFFF)) & 0xFFFFFFFF
+    return (t ^ (t >> 14)) / 4294967296.0, a
+
+
+def replay_one(log):
+    """``replay_logs`` for a single log, stepped in plain Python floats.
+
+    Follows ``GameBatch.step`` operation for operation, so the two agree
+    to the bit; tests/test_replay.py checks them against each other.
+    """
+    width, height = log.width, log.height
+    speed, gravity, jump, gap = (config_value(param, code) for param, code in zip(CONFIG_PARAMS, log.config))
+    jump = -jump
+    pipe_width = width * PIPE_WIDTH_RATIO
+    margin = height * MARGIN_RATIO
+    scale = FRAME_MS / 16
+    state = log.seed
+    y, vy, timer, score = height / 2, 0.0, 0.0, 0
+    pipes = []  # [x, center, scored]
+    events = iter(log.events)
+    event = next(events, None)
+    step = 0
+    while step < log.steps:
+        flap = False
+        while event is not None and event[0] == step:
+            _, kind, param, code = event
+            if kind == EVENT_FLAP:
+                flap = True
+            elif param == 0:
+                speed = code
+            elif param == 1:
+                gravity = config_value("gravity", code)
+            elif param == 2:
+                jump = -code
+            else:
+                gap = code
+            event = next(events, None)
+        if flap:
+            vy = jump
+
+        timer += FRAME_MS
+        if timer > PIPE_INTERVAL_MS:
+            timer = 0.0
+            value, state = _random(state)
+            pipes.append([width + PIPE_SPAWN_OFFSET, value * (height - margin * 2 - gap) + margin + gap / 2, False])
+        shift = speed * PIPE_SPEED_SCALE * scale
+        vy = vy + gravity * scale
+        y = y + vy * scale
+        half_gap = gap / 2
+        hit = False
+        for pipe in pipes:
+            pipe[0] = x = pipe[0] - shift
+            if not pipe[2] and x + pipe_width < PLAYER_X:
+                pipe[2] = True
+                score += 1
+            if PLAYER_X < x + pipe_width and PLAYER_X + PLAYER_SIZE > x:
+                top_height = pipe[1] - half_gap
+                bottom_y = pipe[1] + half_gap
+                hit = hit or (y < top_height and y + PLAYER_SIZE > 0) or (
+                    y < bottom_y + (height - bottom_y) and y + PLAYER_SIZE > bottom_y)
+        # Passed pipes can never score or collide again
+        if pipes and pipes[0][2]:
+            pipes = [pipe for pipe in pipes if not pipe[2]]
+        step += 1
+        if hit or y + PLAYER_SIZE > height - FLOOR_MARGIN:
+            return score, step, False
+        if y < 0:
+            y, vy = 0.0, 0.0
+    return score, step, True
+
+
+def verify_runs(submissions):
+    """Check ``(log, claimed_score)`` pairs; returns a list of booleans.
+
+    ``log`` is a RunLog or an encoded log. A run passes when its log
+    replays to exactly the claimed score and the player dies on the final
+    logged step, no earlier and no later. Malformed entries and runs longer
+    than their score allows (``max_steps``) fail without being replayed.
+    """
+    verdicts = [False] * len(submissions)
+    logs, index = [], []
+    for i, (data, claimed) in enumerate(submissions):
+        try:
+            log = data if isinstance(data, RunLog) else decode_log(data)
+            if type(claimed) is not int or claimed < 0:
+                raise ReplayError(f"score is not a count: {claimed!r}")
+            if log.steps > max_steps(log, claimed):
+                raise ReplayError("run lasted longer than its score allows")
+        except ReplayError:
+            continue
+        logs.append(log)
+        index.append(i)
+    if len(logs) == 1:
+        scores, frames, alive = ([value] for value in replay_one(logs[0]))
+    elif logs:
+        scores, frames, alive = replay_logs(logs)
+    for j, i in enumerate(index):
+        claimed = submissions[i][1]
+        verdicts[i] = bool(
+            scores[j] == claimed and frames[j] == logs[j].steps and not alive[j]
+        )
+    return verdicts
@@ -0,0 +1,127 @@
+# flappy/serving.py
+import functools
+import os
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from flappy.disk import DiskUsage
+
+# How game assets reach the browser:
+#   "static" - content-hashed files under ./static at /app/static/assets/.
+#              Started as ``streamlit run flappy_app.py`` the app answers
+#              those URLs itself with immutable cache headers (asset_routes).
+#              Under a plain ``streamlit run flappy_streamlit26.py`` Streamlit's
+#              own static handler serves them (needs server.enableStaticServing,
+#              see .streamlit/config.toml) with ETag/Last-Modified only, so
+#              browsers revalidate each asset once per page load.
+#   "server" - the same files served by a small built-in handler on
+#              FLAPPY_ASSET_PORT with immutable cache headers
+#   "inline" - base64 data URLs inside the component HTML (the old behaviour)
+ASSET_MODE = os.environ.get("FLAPPY_ASSET_MODE", "static")
+ASSET_PORT = int(os.environ.get("FLAPPY_ASSET_PORT", "8600"))
+
+STATIC_ROUTE = "app/static/assets/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+EXT_BY_MIME = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "audio/mpeg": "mp3",
+    "audio/mp4": "m4a",
+    "audio/ogg": "ogg",
+    "audio/wav": "wav",
+}
+
+
+class StaticAssetStore:
+    """Write-once directory of assets named by their content hash.
+
+    A file's name never changes while its bytes stay the same, so browsers
+    can keep it forever and every session that uses the same art or music
+    points at the same URL. Assets nobody has asked for lately are swept
+    (see flappy.disk); callers ``touch`` a name they have cached and publish
+    it again if it is gone.
+    """
+
+    def __init__(self, root, base_url=STATIC_ROUTE):
+        self.root = root
+        self.base_url = base_url
+        os.makedirs(root, exist_ok=True)
+        self.usage = DiskUsage(root)
+        self.usage.sweep()
+
+    def filename(self, digest, mime):
+        return f"{digest[:20]}.{EXT_BY_MIME.get(mime, 'bin')}"
+
+    def publish(self, raw, mime, digest):
+        name = self.filename(digest, mime)
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            # Write to a temp file first so a concurrent request never sees
+            # a half-written asset.
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(raw)
+            os.replace(tmp, path)
+            self.usage.used(path)
+        else:
+            self.usage.touch(path)
+        self.usage.maybe_sweep()
+        return name
+
+    def touch(self, name):
+        """Mark a published asset as in use; False if it has been swept."""
+        return self.usage.touch(os.path.join(self.root, name))
+
+
+class _ImmutableAssetHandler(SimpleHTTPRequestHandler):
+    def end_headers(self):
+        self.send_header("Cache-Control", IMMUTABLE)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def list_directory(self, path):
+        self.send_error(404)
+        return None
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_asset_server(root, port=ASSET_PORT):
+    """Serve ``root`` on ``port`` from a daemon thread and return the server."""
+    handler = functools.partial(_ImmutableAssetHandler, directory=root)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="flappy-assets", daemon=True).start()
+    return server
+
+
+def asset_routes(root):
+    """Starlette routes serving ``root`` at STATIC_ROUTE, marked immutable.
+
+    Mounted by flappy_app.py ahead of Streamlit's own handlers, so the
+    component keeps its same-origin URLs but browsers never ask for a
+    content-hashed file twice.
+    """
+    from starlette.responses import FileResponse, Response
+    from starlette.routing import Route
+
+    headers = {
+        "Cache-Control": IMMUTABLE,
+        "Access-Control-Allow-Origin": "*",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    async def asset(request):
+        # {name} never matches a "/", so the path cannot leave root; dotfiles
+        # are in-flight writes and bookkeeping, not assets
+        name = request.path_params["name"]
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            return Response(status_code=404)
+        return FileResponse(path, headers=headers)
+
+    return [Route("/" + STATIC_ROUTE + "{name}", asset, methods=["GET", "HEAD"])]
@@ -0,0 +1,186 @@
+# flappy/sim.py
+"""Headless, vectorized replica of the in-browser game rules.
+
+Mirrors ``update``, ``spawnPipe`` and ``checkCollisions`` in
+flappy/frontend/index.html step for step, but keeps thousands of
+independent games as struct-of-arrays so one ``step`` advances all of them.
+Keep the two in sync: if a rule changes in the JS, change it here too.
+"""
+import math
+
+import numpy as np
+
+PLAYER_X = 100
+PLAYER_SIZE = 50
+PIPE_INTERVAL_MS = 1800
+PIPE_WIDTH_RATIO = 0.08
+PIPE_SPAWN_OFFSET = 100  # pipes enter at canvas.width + 100
+PIPE_DESPAWN_MARGIN = 120  # and leave once x + 120 < 0
+PIPE_SPEED_SCALE = 0.8
+FLOOR_MARGIN = 10
+MARGIN_RATIO = 0.15
+FRAME_MS = 1000 / 60
+
+
+def pipe_capacity(width, min_speed):
+    """Most pipes that can be alive at once for a canvas width and speed."""
+    px_per_ms = min_speed * PIPE_SPEED_SCALE / 16
+    travel = width + PIPE_SPAWN_OFFSET + PIPE_DESPAWN_MARGIN
+    return math.ceil(travel / px_per_ms / PIPE_INTERVAL_MS) + 2
+
+
+class Mulberry32:
+    """Vectorized port of the game's ``mulberry32`` PRNG, one stream per game."""
+
+    def __init__(self, seeds):
+        self.state = np.asarray(seeds, dtype=np.uint32).copy()
+
+    def random(self, rows):
+        a = self.state[rows] + np.uint32(0x6D2B79F5)
+        self.state[rows] = a
+        t = (a ^ (a >> np.uint32(15))) * (a | np.uint32(1))
+        t ^= t + (t ^ (t >> np.uint32(7))) * (t | np.uint32(61))
+        return (t ^ (t >> np.uint32(14))).astype(np.float64) / 4294967296.0
+
+
+class GameBatch:
+    """State for ``n`` independent games.
+
+    Every parameter may be a scalar or an array of length ``n``. Pipe slots
+    form a ring per game; empty slots sit at x = +inf so they never score
+    or collide. Pass ``seed`` (one per game) to draw pipe centers from the
+    same PRNG stream the browser used for that run.
+    """
+
+    def __init__(self, n, width=900, height=600, game_speed=3, gravity=0.5,
+                 jump_power=12, pipe_gap=180, rng=None, seed=None, capacity=None):
+        self.n = n
+        vec = lambda v: np.broadcast_to(np.asarray(v, dtype=np.float64), (n,)).copy()
+        self.width = vec(width)
+        self.height = vec(height)
+        self.game_speed = vec(game_speed)
+        self.gravity = vec(gravity)
+        self.jump_power = -vec(jump_power)
+        self.pipe_gap = vec(pipe_gap)
+        self.pipe_width = self.width * PIPE_WIDTH_RATIO
+        if seed is not None:
+            self.rng = Mulberry32(np.broadcast_to(seed, (n,)))
+        else:
+            self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.capacity = capacity or pipe_capacity(self.width.max(), self.game_speed.min())
+        self.rows = np.arange(n)
+        self.reset()
+
+    def reset(self):
+        n, k = self.n, self.capacity
+        self.y = self.height / 2
+        self.vy = np.zeros(n)
+        self.alive = np.ones(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.frames = np.zeros(n, dtype=np.int64)
+        self.pipe_timer = np.zeros(n)
+        self.spawned = np.zeros(n, dtype=np.int64)
+        self.pipe_x = np.full((n, k), np.inf)
+        self.pipe_center = np.zeros((n, k))
+        self.pipe_scored = np.ones((n, k), dtype=bool)
+
+    def take(self, rows):
+        """Keep only the games at ``rows``, in that order; repeats branch a game."""
+        rows = np.asarray(rows, dtype=np.int64)
+        for name in ("width", "height", "game_speed", "gravity", "jump_power", "pipe_gap", "pipe_width",
+                     "y", "vy", "alive", "score", "frames", "pipe_timer", "spawned",
+                     "pipe_x", "pipe_center", "pipe_scored"):
+            setattr(self, name, getattr(self, name)[rows])
+        if isinstance(self.rng, Mulberry32):
+            self.rng = Mulberry32(self.rng.state[rows])
+        self.n = len(rows)
+        self.rows = np.arange(self.n)
+
+    def uniform(self, rows):
+        """Stand-in for Math.random() for the games in ``rows``."""
+        if isinstance(self.rng, Mulberry32):
+            return self.rng.random(rows)
+        return self.rng.random(len(rows))
+
+    def flap(self, mask):
+        mask = mask & self.alive
+        self.vy[mask] = self.jump_power[mask]
+
+    def step(self, dt=FRAME_MS, flap=None):
+        """Advance every live game by one ``update(dt)`` call."""
+        if flap is not None:
+            self.flap(flap)
+        # Work on live rows only; finished games cost nothing once gathered out
+        if self.alive.all():
+            r = slice(None)
+        else:
+            r = np.flatnonzero(self.alive)
+            if not r.size:
+                return self.alive
+        scale = dt / 16
+
+        # Spawn pipes
+        timer = self.pipe_timer[r] + dt
+        due = timer > PIPE_INTERVAL_MS
+        timer[due] = 0
+        self.pipe_timer[r] = timer
+        spawn = self.rows[r][due]
+        if spawn.size:
+            h = self.height[spawn]
+            gap = self.pipe_gap[spawn]
+            margin = h * MARGIN_RATIO
+            center = self.uniform(spawn) * (h - margin * 2 - gap) + margin + gap / 2
+            slot = self.spawned[spawn] % self.capacity
+            self.pipe_x[spawn, slot] = self.width[spawn] + PIPE_SPAWN_OFFSET
+            self.pipe_center[spawn, slot] = center
+            self.pipe_scored[spawn, slot] = False
+            self.spawned[spawn] += 1
+
+        # Move pipes and player
+        pipe_x = self.pipe_x[r] - (self.game_speed[r] * PIPE_SPEED_SCALE * scale)[:, None]
+        self.pipe_x[r] = pipe_x
+        vy = self.vy[r] + self.gravity[r] * scale
+        y = self.y[r] + vy * scale
+
+        # Score and collide
+        height = self.height[r]
+        center = self.pipe_center[r]
+        pw = self.pipe_width[r][:, None]
+        half_gap = self.pipe_gap[r][:, None] / 2
+        top_height = center - half_gap
+        bottom_y = center + half_gap
+
+        scored = self.pipe_scored[r]
+        passed = ~scored & (pipe_x + pw < PLAYER_X)
+        self.pipe_scored[r] = scored | passed
+        self.score[r] += passed.sum(axis=1, dtype=np.int32)
+
+        yc = y[:, None]
+        overlap_x = (PLAYER_X < pipe_x + pw) & (PLAYER_X + PLAYER_SIZE > pipe_x)
+        hit_top = (yc < top_height) & (yc + PLAYER_SIZE > 0)
+        # bottom rect is {y: bottomY, height: canvas.height - bottomY}; keep the
+        # JS rounding of bottomY + height rather than simplifying to height
+        hit_bottom = (yc < bottom_y + (height[:, None] - bottom_y)) & (yc + PLAYER_SIZE > bottom_y)
+        hit = (overlap_x & (hit_top | hit_bottom)).any(axis=1)
+
+        floor = y + PLAYER_SIZE > height - FLOOR_MARGIN
+        self.frames[r] += 1
+        self.alive[r] = ~hit & ~floor
+
+        ceiling = y < 0
+        y[ceiling] = 0
+        vy[ceiling] = 0
+        self.y[r] = y
+        self.vy[r] = vy
+        return self.alive
+
+    def run(self, policy=None, max_frames=36000, dt=FRAME_MS):
+        """Step until every game is over or ``max_frames`` have passed.
+
+        ``policy(batch)`` returns a boolean flap mask before each step.
+        """
+        for _ in range(max_frames):
+            if not self.step(dt, policy(self) if policy else None).any():
+                break
+        return self.score
@@ -0,0 +1,207 @@
+# flappy/tracing.py
+"""Per-rerun tracing of the script's stages.
+
+A rerun that is being traced opens a ``Trace`` for the script thread; code
+anywhere below it wraps its stages in ``span(name)`` and reports what it
+processed with ``add(bytes=..., hits=..., misses=...)``. Finished traces go
+to a rotating JSON-lines log and to a short per-session history that the
+debug panel shows.
+
+Tracing is off unless ``FLAPPY_TRACE`` is set or the session asks for it
+(``?debug=trace``). Untraced, ``span`` returns a shared no-op and ``add``
+returns after one attribute lookup, so the calls can stay in the code.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from logging.handlers import RotatingFileHandler
+
+log = logging.getLogger(__name__)
+
+ALWAYS = os.environ.get("FLAPPY_TRACE", "") not in ("", "0")
+LOG_MB = float(os.environ.get("FLAPPY_TRACE_LOG_MB", "5"))
+LOG_BACKUPS = 3
+# Reruns kept per session for the debug panel
+HISTORY = 20
+MAX_SESSIONS = 256
+
+
+class _Local(threading.local):
+    # Class defaults keep the untraced lookups off the AttributeError path
+    trace = None
+    span = None
+
+
+_local = _Local()
+
+
+class _NullSpan:
+    """Stands in for a span when nothing is traced; false in a boolean test."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def add(self, **counts):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("trace", "name", "attrs", "depth", "start", "ms", "counts", "parent")
+
+    def __init__(self, trace, name, attrs, parent):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.start = 0.0
+        self.ms = None
+        self.counts = {}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        _local.span = self
+        return self
+
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self.start) * 1000
+        _local.span = self.parent
+        # A stage's totals include its sub-spans
+        if self.parent is not None:
+            self.parent.add(**self.counts)
+        return False
+
+    def add(self, **counts):
+        for name, n in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def record(self):
+        entry = {
+            "name": self.name,
+            "depth": self.depth,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "ms": None if self.ms is None else round(self.ms, 3),
+        }
+        entry.update(self.counts)
+        entry.update(self.attrs)
+        return entry
+
+
+class Trace:
+    """One rerun of one session; see ``Tracer.start``."""
+
+    def __init__(self, tracer, session, rerun):
+        self.tracer = tracer
+        self.session = session
+        self.rerun = rerun
+        self.spans = []
+        self.wall = time.time()
+        self.start = time.perf_counter()
+
+    def __bool__(self):
+        return True
+
+    def span(self, name, attrs):
+        span = Span(self, name, attrs, _local.span)
+        self.spans.append(span)
+        return span
+
+    def finish(self):
+        """Stop tracing this thread and hand the record to the tracer."""
+        if _local.trace is self:
+            _local.trace = _local.span = None
+        record = {
+            "ts": round(self.wall, 3),
+            "session": self.session,
+            "rerun": self.rerun,
+            "ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "spans": [span.record() for span in self.spans],
+        }
+        self.tracer.record(record)
+        return record
+
+
+def span(name, **attrs):
+    """Context manager timing ``name`` within the current trace, if any."""
+    trace = _local.trace
+    if trace is None:
+        return NULL_SPAN
+    return trace.span(name, attrs)
+
+
+def add(**counts):
+    """Add ``counts`` (bytes, hits, misses, ...) to the innermost open span."""
+    current = _local.span
+    if current is not None:
+        current.add(**counts)
+
+
+class Tracer:
+    """Process-wide sink for finished traces."""
+
+    def __init__(self, log_path=None, history=HISTORY, always=ALWAYS,
+                 max_bytes=int(LOG_MB * 1024 * 1024), backups=LOG_BACKUPS):
+        self.always = always
+        self.history = history
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._handler = None
+        if log_path:
+            try:
+                os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+                self._handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups,
+                                                    encoding="utf-8")
+            except OSError as exc:
+                log.warning("Could not open the trace log %s (%s); keeping traces in memory", log_path, exc)
+
+    def start(self, session, enabled=False):
+        """Trace the calling thread's rerun if ``enabled`` or ``always``.
+
+        Returns the ``Trace`` (call ``finish`` at the end of the script) or
+        ``NULL_SPAN``. A trace left open by an interrupted rerun is dropped.
+        """
+        if not (enabled or self.always):
+            _local.trace = _local.span = None
+            return NULL_SPAN
+        with self._lock:
+            runs = self._sessions.get(session)
+            rerun = runs[-1]["rerun"] + 1 if runs else 1
+        trace = _local.trace = Trace(self, session, rerun)
+        _local.span = None
+        return trace
+
+    def record(self, record):
+        session = record["session"]
+        with self._lock:
+            runs = self._sessions.get(session)
+            if runs is None:
+                runs = self._sessions[session] = deque(maxlen=self.history)
+                while len(self._sessions) > MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session)
+            runs.append(record)
+        if self._handler is not None:
+            line = json.dumps(record, separators=(",", ":"), default=str)
+            self._handler.handle(logging.makeLogRecord({"msg": line, "args": None}))
+
+    def recent(self, session):
+        """The session's last reruns, newest first."""
+        with self._lock:
+            return list(reversed(self._sessions.get(session, ())))
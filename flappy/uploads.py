@@ -0,0 +1,147 @@
+# flappy/uploads.py
+"""Content-addressed, on-disk store for uploaded assets.
+
+Uploads are hashed in chunks while they are spooled to disk, so the same
+sprite or song uploaded by a whole class is stored once. Sessions keep only
+the hash (see ``StoredUpload`` and ``store_uploads``); the bytes are read
+back from disk on the rare cache miss. Files nobody has used for
+``max_age`` seconds, and the least recently used ones once the store
+outgrows its size limit, are removed by a periodic sweep (see flappy.disk).
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from flappy import tracing
+from flappy.disk import DiskUsage
+
+log = logging.getLogger(__name__)
+
+MAX_UPLOAD_MB = int(os.environ.get("FLAPPY_UPLOAD_MAX_MB", "25"))
+MAX_AGE_HOURS = float(os.environ.get("FLAPPY_UPLOAD_MAX_AGE_HOURS", "24"))
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class StoredUpload:
+    """What a session holds for an upload: its file name and content hash."""
+
+    __slots__ = ("name", "digest", "store")
+
+    def __init__(self, name, digest, store):
+        self.name = name
+        self.digest = digest
+        self.store = store
+
+    def read(self):
+        return self.store.read(self.digest)
+
+
+class UploadStore:
+    def __init__(self, root, max_bytes=MAX_UPLOAD_MB * 1024 * 1024, max_age=MAX_AGE_HOURS * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self.usage = DiskUsage(root, max_age)
+        self.usage.sweep()
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def ingest(self, fileobj):
+        """Spool ``fileobj`` into the store and return its content hash.
+
+        Raises ``UploadTooLarge`` once more than ``max_bytes`` have been read.
+        """
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                fileobj.seek(0)
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"{fileobj.name} is larger than {self.max_bytes // (1024 * 1024)} MB")
+                    h.update(chunk)
+                    f.write(chunk)
+            digest = h.hexdigest()
+            target = self.path(digest)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.exists(target):
+                # Someone uploaded the same bytes before: keep their copy
+                os.unlink(tmp)
+                os.utime(target)
+            else:
+                os.replace(tmp, target)
+            tracing.add(bytes=size, misses=1)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        finally:
+            fileobj.seek(0)
+        self.usage.used(target)
+        self.usage.maybe_sweep()
+        return digest
+
+    def touch(self, digest):
+        """Mark ``digest`` as in use; False if the store no longer has it."""
+        return self.usage.touch(self.path(digest))
+
+    def read(self, digest):
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def sweep(self):
+        """Delete uploads (and stale temp files) nobody has used lately."""
+        return self.usage.sweep()
+
+
+def store_uploads(uploads, store, known, rejected=None):
+    """Swap each upload for a ``StoredUpload`` in ``store``.
+
+    ``uploads`` maps roles to a file, a list of files (player animation
+    frames) or None. ``known`` maps upload ids to the hash they were stored
+    under on an earlier rerun; those are only touched, not read again.
+    ``rejected`` maps upload ids turned away on an earlier rerun to the
+    reason; those are skipped without spooling them again.
+    Returns ``(stored, digests, errors)``: the handles by role, the upload id
+    -> hash map to keep for the next rerun, and the upload id -> reason map
+    of the files that were turned away, to pass back as ``rejected``.
+    """
+    rejected = rejected or {}
+    digests = {}
+    errors = {}
+
+    def one(fileobj):
+        if fileobj.file_id in rejected:
+            errors[fileobj.file_id] = rejected[fileobj.file_id]
+            return None
+        digest = known.get(fileobj.file_id)
+        if digest is not None and store.touch(digest):
+            tracing.add(hits=1)
+        else:
+            try:
+                digest = store.ingest(fileobj)
+            except UploadTooLarge as exc:
+                errors[fileobj.file_id] = str(exc)
+                return None
+        digests[fileobj.file_id] = digest
+        return StoredUpload(fileobj.name, digest, store)
+
+    stored = {}
+    for role, fileobj in uploads.items():
+        if isinstance(fileobj, list):
+            stored[role] = [frame for frame in map(one, fileobj) if frame is not None]
+        else:
+            stored[role] = one(fileobj) if fileobj is not None else None
+    return stored, digests, errors
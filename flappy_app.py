@@ -0,0 +1,22 @@
+# flappy_app.py
+"""Serve the game and its assets from one origin with long-lived caching.
+
+    streamlit run flappy_app.py
+
+runs flappy_streamlit26.py unchanged, but answers the content-hashed asset
+URLs (see flappy.serving) itself and marks them immutable. Plain
+``streamlit run flappy_streamlit26.py`` still works; assets then only get
+Streamlit's revalidation headers.
+"""
+import os
+
+import streamlit as st
+
+from flappy.serving import asset_routes
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+app = st.App(
+    os.path.join(APP_DIR, "flappy_streamlit26.py"),
+    routes=asset_routes(os.path.join(APP_DIR, "static", "assets")),
+)
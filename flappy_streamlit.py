@@ -1 +1 @@
-streamlit run flappy_streamlit26.py
+streamlit run flappy_app.py
@@ -1,10 +1,41 @@
 # flappy_streamlit26.py
-import streamlit as st
-import base64
+import json
 import os
+import uuid
+
+import streamlit as st
+
+from flappy import tracing
+from flappy.assets import build_game_assets
+from flappy.cache import AssetCache
+from flappy.calibrate import load_table
+from flappy.catalog import REPO_ASSETS, AssetCatalog
+from flappy.component import acknowledge, flappy_game, pending_messages
+from flappy.leaderboard import Leaderboard
+from flappy.perf import PerfStats
+from flappy.replay import EVENT_CONFIG, ReplayError, log_digest, read_config, read_run, verify_runs
+from flappy.serving import ASSET_MODE, ASSET_PORT, StaticAssetStore, start_asset_server
+from flappy.tracing import Tracer
+from flappy.uploads import UploadStore, store_uploads
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LEADERBOARD_DB = os.environ.get("FLAPPY_LEADERBOARD_DB", os.path.join(APP_DIR, ".data", "leaderboard.db"))
+TRACE_LOG = os.environ.get("FLAPPY_TRACE_LOG", os.path.join(APP_DIR, ".data", "trace.log"))
 
 st.set_page_config(page_title="Premium Flappy Bird", layout="wide", page_icon="🐦")
 
+# --------- Rerun Tracing ---------
+@st.cache_resource
+def get_tracer():
+    # Finished reruns go to a rotating JSON-lines log and the debug panel
+    return Tracer(TRACE_LOG)
+
+tracer = get_tracer()
+# ?debug=trace traces this session's reruns and shows the breakdown
+show_trace = st.query_params.get("debug") == "trace"
+trace_session = st.session_state.setdefault("trace_session", uuid.uuid4().hex[:12])
+trace = tracer.start(trace_session, enabled=show_trace)
+
 # Custom CSS for premium look
 st.markdown("""
 <style>
@@ -54,15 +85,38 @@ st.markdown("""
 st.markdown('<div class="main-header">🎮 Premium Flappy Bird</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Customize your gaming experience with stunning visuals and audio</div>', unsafe_allow_html=True)
 
+# --------- Difficulty Presets ---------
+@st.cache_resource
+def get_calibration():
+    # Sweep results from `python -m flappy.calibrate`; None if not generated
+    return load_table()
+
+calibration = get_calibration()
+DIFFICULTY_DEFAULTS = {"game_speed": 3, "gravity": 0.5, "jump_power": 12, "pipe_gap": 180}
+for setting, value in DIFFICULTY_DEFAULTS.items():
+    st.session_state.setdefault(setting, value)
+
+def apply_preset():
+    preset = (calibration.presets() if calibration else {}).get(st.session_state["preset"])
+    if preset:
+        speed, gravity, jump, gap = preset
+        st.session_state.update(game_speed=speed, gravity=gravity / 100, jump_power=jump, pipe_gap=gap)
+
+def custom_settings():
+    st.session_state["preset"] = "Custom"
+
 # --------- Premium Sidebar Design ---------
-with st.sidebar:
+with tracing.span("sidebar"), st.sidebar:
     st.markdown("### 🎨 Game Studio")
     
     with st.container():
         st.markdown("#### 🖼️ Visual Assets")
         with st.expander("Upload Images", expanded=True):
             up_bg = st.file_uploader("🌅 Background", type=["png","jpg","jpeg"], key="bg")
-            up_player = st.file_uploader("🐦 Player Character", type=["png","jpg","jpeg"], key="player")
+            up_player = st.file_uploader("🐦 Player Character", type=["png","jpg","jpeg"], key="player",
+                                         accept_multiple_files=True,
+                                         help="One image, a sprite strip of square frames side by side, "
+                                              "or several frames in order; frames animate as the player flaps.")
             up_pipe = st.file_uploader("🚧 Obstacles", type=["png","jpg","jpeg"], key="pipe")
             up_bag = st.file_uploader("💼 Character's Bag", type=["png","jpg","jpeg"], key="bag")
 
@@ -72,742 +126,229 @@ with st.sidebar:
             up_menu_music = st.file_uploader("🏠 Menu Music", type=["mp3","ogg","wav"], key="menu_music")
             up_ingame_music = st.file_uploader("🎮 Game Music", type=["mp3","ogg","wav"], key="ingame_music")
             up_gameover_music = st.file_uploader("💀 Game Over Music", type=["mp3","ogg","wav"], key="gameover_music")
+        with st.expander("Sound Effects"):
+            up_sfx_flap = st.file_uploader("🪽 Flap", type=["mp3","ogg","wav"], key="sfx_flap")
+            up_sfx_score = st.file_uploader("⭐ Score Point", type=["mp3","ogg","wav"], key="sfx_score")
+            up_sfx_countdown = st.file_uploader("⏱️ Countdown", type=["mp3","ogg","wav"], key="sfx_countdown")
+            up_sfx_crash = st.file_uploader("💥 Crash (score 0-5)", type=["mp3","ogg","wav"], key="sfx_crash")
+            up_sfx_ending = st.file_uploader("🏁 Crash (score 6+)", type=["mp3","ogg","wav"], key="sfx_ending")
 
     with st.container():
         st.markdown("#### ⚙️ Game Settings")
         with st.expander("Difficulty & Controls", expanded=True):
+            if calibration:
+                st.selectbox("Preset", ["Custom", *calibration.presets()], key="preset", on_change=apply_preset)
             col1, col2 = st.columns(2)
             with col1:
-                game_speed = st.slider("Speed", 1, 10, 3)
-                gravity_strength = st.slider("Gravity", 0.1, 1.0, 0.5)
+                game_speed = st.slider("Speed", 1, 10, key="game_speed", on_change=custom_settings)
+                gravity_strength = st.slider("Gravity", 0.1, 1.0, key="gravity", on_change=custom_settings)
             with col2:
-                jump_power = st.slider("Jump Power", 5, 20, 12)
-                pipe_gap = st.slider("Pipe Gap", 120, 250, 180)
+                jump_power = st.slider("Jump Power", 5, 20, key="jump_power", on_change=custom_settings)
+                pipe_gap = st.slider("Pipe Gap", 120, 250, key="pipe_gap", on_change=custom_settings)
+            if calibration and calibration.impossible(
+                    (game_speed, round(gravity_strength * 100), jump_power, pipe_gap)):
+                st.warning("⚠️ With these settings not even perfectly timed flaps get through a pipe. "
+                           "Try a wider gap or a weaker jump.")
+
+    with st.container():
+        st.markdown("#### 🏆 Leaderboard")
+        player_name = st.text_input("🏷️ Your Name", key="player_name", max_chars=24,
+                                    placeholder="Anonymous")
 
     st.markdown("---")
     st.success("🎯 **Pro Tip**: Upload high-quality assets for the best gaming experience!")
 
 # --------- File Processing ---------
-def fileobj_to_data_url(fileobj, default_path=None):
-    if fileobj is not None:
-        raw = fileobj.read()
-        name = fileobj.name.lower()
-        mime = "image/png"
-        if name.endswith(".jpg") or name.endswith(".jpeg"):
-            mime = "image/jpeg"
-        elif name.endswith(".mp3"):
-            mime = "audio/mpeg"
-        elif name.endswith(".ogg"):
-            mime = "audio/ogg"
-        elif name.endswith(".wav"):
-            mime = "audio/wav"
-        return f"data:{mime};base64," + base64.b64encode(raw).decode()
-    
-    if default_path and os.path.exists(default_path):
-        with open(default_path, "rb") as f:
-            raw = f.read()
-        ext = default_path.lower().split(".")[-1]
-        mime = "image/png"
-        if ext in ("jpg", "jpeg"):
-            mime = "image/jpeg"
-        elif ext == "mp3":
-            mime = "audio/mpeg"
-        elif ext == "ogg":
-            mime = "audio/ogg"
-        elif ext == "wav":
-            mime = "audio/wav"
-        return f"data:{mime};base64," + base64.b64encode(raw).decode()
+@st.cache_resource
+def get_asset_cache():
+    # One cache per server process, shared by every session and rerun
+    return AssetCache()
+
+@st.cache_resource
+def get_asset_store():
+    # Content-hashed files served by URL; None means inline data URLs
+    root = os.path.join(APP_DIR, "static", "assets")
+    if ASSET_MODE == "server":
+        start_asset_server(root, ASSET_PORT)
+        return StaticAssetStore(root)
+    if ASSET_MODE == "static" and st.get_option("server.enableStaticServing"):
+        return StaticAssetStore(root)
     return None
 
-# File mappings
-REPO_BG = "background_image.png"
-REPO_PLAYER = "player_character.png"
-REPO_PIPE = "obstacle_enemy.png"
-REPO_BAG = "player_character.png"  # Fallback to player image
-REPO_MENU_MUSIC = "Home Screen Music (Only on Menu Screen).mp3"
-REPO_INGAME_MUSIC = "ingame_music_1.mp3"
-REPO_GAMEOVER_MUSIC = "ingame_music_2.mp3"
+def asset_base_url(store):
+    if store is None or ASSET_MODE != "server":
+        return None
+    host = (st.context.headers.get("Host") or "localhost").rsplit(":", 1)[0]
+    return f"//{host}:{ASSET_PORT}/"
+
+@st.cache_resource
+def get_upload_store():
+    # Uploads deduplicated across sessions by content hash
+    return UploadStore(os.path.join(APP_DIR, ".data", "uploads"))
+
+def stored_uploads(uploads):
+    """Swap each upload for a handle on its stored copy.
+
+    The session only remembers which content hash each upload id became,
+    and which uploads were too large, so those are not read again on every
+    rerun.
+    """
+    known = st.session_state.get("upload_digests", {})
+    rejected = st.session_state.get("upload_rejected", {})
+    stored, digests, errors = store_uploads(uploads, upload_store, known, rejected)
+    for reason in errors.values():
+        st.sidebar.error(f"⚠️ {reason}; using the default instead.")
+    st.session_state["upload_digests"] = digests
+    st.session_state["upload_rejected"] = errors
+    return stored
+
+@st.cache_resource
+def get_asset_catalog():
+    # Scanned once per process and refreshed in the background on change
+    return AssetCatalog(APP_DIR, REPO_ASSETS)
+
+with tracing.span("resources"):
+    asset_cache = get_asset_cache()
+    asset_store = get_asset_store()
+    asset_base = asset_base_url(asset_store)
+    upload_store = get_upload_store()
+    asset_catalog = get_asset_catalog()
 
 # Process files
-BG_URL = fileobj_to_data_url(up_bg, REPO_BG) or ""
-PLAYER_URL = fileobj_to_data_url(up_player, REPO_PLAYER) or ""
-PIPE_URL = fileobj_to_data_url(up_pipe, REPO_PIPE) or ""
-BAG_URL = fileobj_to_data_url(up_bag, REPO_BAG) or ""
-MENU_MUSIC_URL = fileobj_to_data_url(up_menu_music, REPO_MENU_MUSIC)
-INGAME_MUSIC_URL = fileobj_to_data_url(up_ingame_music, REPO_INGAME_MUSIC)
-GAMEOVER_MUSIC_URL = fileobj_to_data_url(up_gameover_music, REPO_GAMEOVER_MUSIC)
-
-# --------- Premium Game HTML ---------
-game_html = f'''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Premium Flappy Bird</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            overflow: hidden;
-        }}
-
-        .game-container {{
-            position: relative;
-            width: 95%;
-            max-width: 900px;
-            background: rgba(255, 255, 255, 0.1);
-            backdrop-filter: blur(20px);
-            border-radius: 20px;
-            padding: 20px;
-            box-shadow: 0 25px 50px rgba(0, 0, 0, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-
-        #gameCanvas {{
-            width: 100%;
-            height: 70vh;
-            background: #000;
-            border-radius: 15px;
-            display: block;
-            border: 3px solid rgba(255, 255, 255, 0.3);
-            box-shadow: inset 0 0 50px rgba(0, 0, 0, 0.5);
-        }}
-
-        .controls {{
-            position: absolute;
-            top: 20px;
-            left: 20px;
-            z-index: 100;
-            display: flex;
-            gap: 10px;
-        }}
-
-        .control-btn {{
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            color: white;
-            border: none;
-            padding: 12px 20px;
-            border-radius: 10px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-        }}
-
-        .control-btn:hover {{
-            transform: translateY(-2px);
-            box-shadow: 0 6px 20px rgba(102, 126, 234, 0.4);
-        }}
-
-        .score-display {{
-            position: absolute;
-            top: 20px;
-            left: 50%;
-            transform: translateX(-50%);
-            background: rgba(0, 0, 0, 0.7);
-            color: #ffd93d;
-            padding: 10px 25px;
-            border-radius: 25px;
-            font-size: 1.5rem;
-            font-weight: 700;
-            z-index: 100;
-            backdrop-filter: blur(10px);
-            border: 2px solid rgba(255, 217, 61, 0.3);
-        }}
-
-        .countdown {{
-            position: absolute;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            font-size: 6rem;
-            font-weight: 900;
-            color: #ffd93d;
-            text-shadow: 0 0 30px rgba(255, 217, 61, 0.8);
-            z-index: 200;
-            animation: pulse 1s infinite;
-        }}
-
-        @keyframes pulse {{
-            0%, 100% {{ transform: translate(-50%, -50%) scale(1); opacity: 1; }}
-            50% {{ transform: translate(-50%, -50%) scale(1.1); opacity: 0.7; }}
-        }}
-
-        .start-screen {{
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: rgba(0, 0, 0, 0.85);
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            z-index: 300;
-            border-radius: 15px;
-        }}
-
-        .start-content {{
-            text-align: center;
-            color: white;
-            padding: 40px;
-        }}
-
-        .start-title {{
-            font-size: 3.5rem;
-            font-weight: 800;
-            background: linear-gradient(135deg, #ffd93d, #ff6b6b);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin-bottom: 20px;
-        }}
-
-        .start-subtitle {{
-            font-size: 1.2rem;
-            color: #ccc;
-            margin-bottom: 30px;
-            line-height: 1.6;
-        }}
-
-        .start-btn {{
-            background: linear-gradient(135deg, #ff6b6b, #ffd93d);
-            color: white;
-            border: none;
-            padding: 20px 50px;
-            font-size: 1.5rem;
-            font-weight: 700;
-            border-radius: 15px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 10px 30px rgba(255, 107, 107, 0.4);
-        }}
-
-        .start-btn:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 15px 40px rgba(255, 107, 107, 0.6);
-        }}
-
-        .game-over {{
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: rgba(0, 0, 0, 0.9);
-            display: none;
-            justify-content: center;
-            align-items: center;
-            z-index: 400;
-            border-radius: 15px;
-        }}
-
-        .game-over-content {{
-            text-align: center;
-            color: white;
-            padding: 40px;
-        }}
-
-        .character-popup {{
-            position: absolute;
-            bottom: 50px;
-            left: 50%;
-            transform: translateX(-50%);
-            animation: float 3s ease-in-out infinite;
-        }}
-
-        @keyframes float {{
-            0%, 100% {{ transform: translateX(-50%) translateY(0px); }}
-            50% {{ transform: translateX(-50%) translateY(-20px); }}
-        }}
-
-        .bag-popup {{
-            position: absolute;
-            bottom: 120px;
-            left: 50%;
-            transform: translateX(-50%);
-            animation: float 3s ease-in-out infinite 0.5s;
-        }}
-
-        .final-score {{
-            font-size: 4rem;
-            font-weight: 800;
-            color: #ffd93d;
-            margin: 20px 0;
-            text-shadow: 0 0 20px rgba(255, 217, 61, 0.5);
-        }}
-
-        .restart-btn {{
-            background: linear-gradient(135deg, #4ecdc4, #44a08d);
-            color: white;
-            border: none;
-            padding: 15px 40px;
-            font-size: 1.2rem;
-            font-weight: 600;
-            border-radius: 10px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            margin-top: 20px;
-        }}
-
-        .restart-btn:hover {{
-            transform: translateY(-3px);
-            box-shadow: 0 10px 25px rgba(78, 205, 196, 0.4);
-        }}
-    </style>
-</head>
-<body>
-    <div class="game-container">
-        <canvas id="gameCanvas"></canvas>
-        
-        <div class="controls">
-            <button class="control-btn" id="musicToggle">🔊 Music</button>
-            <button class="control-btn" id="startBtn">🚀 Start</button>
-        </div>
-        
-        <div class="score-display">
-            Score: <span id="score">0</span>
-        </div>
-
-        <div class="countdown" id="countdown" style="display: none;">3</div>
-
-        <div class="start-screen" id="startScreen">
-            <div class="start-content">
-                <div class="start-title">🎮 Flappy Bird</div>
-                <div class="start-subtitle">
-                    Customize your game with amazing visuals and audio!<br>
-                    Avoid obstacles and achieve the highest score!
-                </div>
-                <button class="start-btn" id="mainStartBtn">START GAME</button>
-            </div>
-        </div>
-
-        <div class="game-over" id="gameOverScreen">
-            <div class="game-over-content">
-                <div style="font-size: 3rem; color: #ff6b6b; margin-bottom: 20px;">💀 Game Over</div>
-                <div class="final-score" id="finalScore">0</div>
-                <div style="color: #ccc; margin-bottom: 30px; font-size: 1.1rem;">
-                    Better luck next time! 🎯
-                </div>
-                <img src="{BAG_URL or PLAYER_URL}" class="bag-popup" style="width: 80px; height: 80px; border-radius: 10px;" alt="Bag">
-                <img src="{PLAYER_URL}" class="character-popup" style="width: 100px; height: 100px; border-radius: 15px;" alt="Character">
-                <br>
-                <button class="restart-btn" id="restartBtn">🔄 Play Again</button>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // Game Configuration
-        const CONFIG = {{
-            PLAYER_URL: "{PLAYER_URL}",
-            PIPE_URL: "{PIPE_URL}",
-            BG_URL: "{BG_URL}",
-            MENU_MUSIC_URL: {('"' + MENU_MUSIC_URL + '"') if MENU_MUSIC_URL else 'null'},
-            INGAME_MUSIC_URL: {('"' + INGAME_MUSIC_URL + '"') if INGAME_MUSIC_URL else 'null'},
-            GAMEOVER_MUSIC_URL: {('"' + GAMEOVER_MUSIC_URL + '"') if GAMEOVER_MUSIC_URL else 'null'},
-            GAME_SPEED: {game_speed},
-            GRAVITY: {gravity_strength},
-            JUMP_POWER: -{jump_power},
-            PIPE_GAP: {pipe_gap}
-        }};
-
-        // Game State
-        let gameState = {{
-            menuAudio: null,
-            ingameAudio: null,
-            gameoverAudio: null,
-            musicEnabled: true,
-            gameRunning: false,
-            gameOver: false,
-            score: 0,
-            player: {{ x: 100, y: 200, vy: 0, size: 50 }},
-            pipes: [],
-            pipeTimer: 0,
-            lastTime: performance.now(),
-            images: {{ bg: null, player: null, pipe: null }},
-            countdownActive: false,
-            countdownValue: 3
-        }};
-
-        // DOM Elements
-        const elements = {{
-            canvas: document.getElementById('gameCanvas'),
-            startScreen: document.getElementById('startScreen'),
-            gameOverScreen: document.getElementById('gameOverScreen'),
-            countdown: document.getElementById('countdown'),
-            score: document.getElementById('score'),
-            finalScore: document.getElementById('finalScore'),
-            musicToggle: document.getElementById('musicToggle'),
-            startBtn: document.getElementById('startBtn'),
-            mainStartBtn: document.getElementById('mainStartBtn'),
-            restartBtn: document.getElementById('restartBtn')
-        }};
-
-        const ctx = elements.canvas.getContext('2d');
-
-        // Initialize Game
-        function initGame() {{
-            setupEventListeners();
-            loadAssets();
-            setupAudio();
-            resizeCanvas();
-            renderMenu();
-        }}
-
-        // Setup Event Listeners
-        function setupEventListeners() {{
-            // Window resize
-            window.addEventListener('resize', resizeCanvas);
-
-            // Music toggle
-            elements.musicToggle.addEventListener('click', toggleMusic);
-
-            // Start buttons
-            elements.mainStartBtn.addEventListener('click', startGame);
-            elements.startBtn.addEventListener('click', startGame);
-            elements.restartBtn.addEventListener('click', restartGame);
-
-            // Game controls
-            window.addEventListener('keydown', (e) => {{
-                if (e.code === 'Space' || e.key === 'ArrowUp') flap();
-            }});
-            elements.canvas.addEventListener('mousedown', flap);
-            elements.canvas.addEventListener('touchstart', (e) => {{
-                e.preventDefault();
-                flap();
-            }}, {{passive: false}});
-        }}
-
-        // Audio Management
-        function setupAudio() {{
-            if (CONFIG.MENU_MUSIC_URL) {{
-                gameState.menuAudio = new Audio(CONFIG.MENU_MUSIC_URL);
-                gameState.menuAudio.loop = true;
-                gameState.menuAudio.volume = 0.4;
-            }}
-            if (CONFIG.INGAME_MUSIC_URL) {{
-                gameState.ingameAudio = new Audio(CONFIG.INGAME_MUSIC_URL);
-                gameState.ingameAudio.loop = true;
-                gameState.ingameAudio.volume = 0.4;
-            }}
-            if (CONFIG.GAMEOVER_MUSIC_URL) {{
-                gameState.gameoverAudio = new Audio(CONFIG.GAMEOVER_MUSIC_URL);
-                gameState.gameoverAudio.volume = 0.4;
-            }}
-
-            // Load music preference
-            try {{
-                const saved = localStorage.getItem('flappy_music_enabled');
-                if (saved !== null) gameState.musicEnabled = saved === '1';
-                updateMusicButton();
-            }} catch (e) {{}}
-        }}
-
-        function toggleMusic() {{
-            gameState.musicEnabled = !gameState.musicEnabled;
-            updateMusicButton();
-            try {{
-                localStorage.setItem('flappy_music_enabled', gameState.musicEnabled ? '1' : '0');
-            }} catch (e) {{}}
-
-            if (!gameState.musicEnabled) {{
-                stopAllAudio();
-            }} else {{
-                playCurrentAudio();
-            }}
-        }}
-
-        function updateMusicButton() {{
-            elements.musicToggle.textContent = gameState.musicEnabled ? '🔊 Music' : '🔇 Music';
-        }}
-
-        function stopAllAudio() {{
-            if (gameState.menuAudio) gameState.menuAudio.pause();
-            if (gameState.ingameAudio) gameState.ingameAudio.pause();
-            if (gameState.gameoverAudio) gameState.gameoverAudio.pause();
-        }}
-
-        function playCurrentAudio() {{
-            if (!gameState.musicEnabled) return;
-            
-            if (gameState.gameOver && gameState.gameoverAudio) {{
-                gameState.gameoverAudio.play().catch(() => {{}});
-            }} else if (gameState.gameRunning && gameState.ingameAudio) {{
-                gameState.ingameAudio.play().catch(() => {{}});
-            }} else if (gameState.menuAudio) {{
-                gameState.menuAudio.play().catch(() => {{}});
-            }}
-        }}
-
-        // Asset Loading
-        function loadImage(url) {{
-            return new Promise((resolve, reject) => {{
-                const img = new Image();
-                img.onload = () => resolve(img);
-                img.onerror = reject;
-                img.src = url;
-            }});
-        }}
-
-        async function loadAssets() {{
-            try {{
-                if (CONFIG.BG_URL) gameState.images.bg = await loadImage(CONFIG.BG_URL);
-                if (CONFIG.PLAYER_URL) gameState.images.player = await loadImage(CONFIG.PLAYER_URL);
-                if (CONFIG.PIPE_URL) gameState.images.pipe = await loadImage(CONFIG.PIPE_URL);
-            }} catch (error) {{
-                console.warn('Failed to load some assets:', error);
-            }}
-        }}
-
-        // Game Flow
-        function startGame() {{
-            elements.startScreen.style.display = 'none';
-            gameState.gameRunning = true;
-            gameState.gameOver = false;
-            
-            if (gameState.menuAudio) gameState.menuAudio.pause();
-            
-            startCountdown();
-        }}
-
-        function startCountdown() {{
-            gameState.countdownActive = true;
-            gameState.countdownValue = 3;
-            elements.countdown.style.display = 'block';
-            elements.countdown.textContent = gameState.countdownValue;
-
-            const countdownInterval = setInterval(() => {{
-                gameState.countdownValue--;
-                elements.countdown.textContent = gameState.countdownValue;
-
-                if (gameState.countdownValue <= 0) {{
-                    clearInterval(countdownInterval);
-                    elements.countdown.style.display = 'none';
-                    gameState.countdownActive = false;
-                    resetGame();
-                    gameState.lastTime = performance.now();
-                    if (gameState.musicEnabled && gameState.ingameAudio) {{
-                        gameState.ingameAudio.play().catch(() => {{}});
-                    }}
-                    requestAnimationFrame(gameLoop);
-                }}
-            }}, 1000);
-        }}
-
-        function restartGame() {{
-            elements.gameOverScreen.style.display = 'none';
-            startGame();
-        }}
-
-        function endGame() {{
-            gameState.gameRunning = false;
-            gameState.gameOver = true;
-
-            if (gameState.ingameAudio) gameState.ingameAudio.pause();
-            
-            elements.finalScore.textContent = gameState.score;
-            elements.gameOverScreen.style.display = 'flex';
-
-            if (gameState.musicEnabled && gameState.gameoverAudio) {{
-                gameState.gameoverAudio.currentTime = 0;
-                gameState.gameoverAudio.play().catch(() => {{}});
-            }}
-
-            // Save best score
-            try {{
-                const best = parseInt(localStorage.getItem('flappy_best') || '0');
-                if (gameState.score > best) {{
-                    localStorage.setItem('flappy_best', gameState.score.toString());
-                }}
-            }} catch (e) {{}}
-        }}
-
-        // Game Logic
-        function resetGame() {{
-            gameState.score = 0;
-            gameState.player.y = elements.canvas.height / 2;
-            gameState.player.vy = 0;
-            gameState.pipes = [];
-            gameState.pipeTimer = 0;
-            elements.score.textContent = '0';
-        }}
-
-        function spawnPipe() {{
-            const margin = elements.canvas.height * 0.15;
-            const center = Math.random() * (elements.canvas.height - margin * 2 - CONFIG.PIPE_GAP) + margin + CONFIG.PIPE_GAP / 2;
-            gameState.pipes.push({{ x: elements.canvas.width + 100, center, scored: false }});
-        }}
-
-        function update(deltaTime) {{
-            if (!gameState.gameRunning || gameState.gameOver || gameState.countdownActive) return;
-
-            // Spawn pipes
-            gameState.pipeTimer += deltaTime;
-            if (gameState.pipeTimer > 1800) {{
-                gameState.pipeTimer = 0;
-                spawnPipe();
-            }}
-
-            // Update pipes
-            gameState.pipes.forEach(pipe => {{
-                pipe.x -= (CONFIG.GAME_SPEED * 0.8) * (deltaTime / 16);
-            }});
-
-            // Remove off-screen pipes
-            if (gameState.pipes.length > 0 && gameState.pipes[0].x + 120 < 0) {{
-                gameState.pipes.shift();
-            }}
-
-            // Update player
-            gameState.player.vy += CONFIG.GRAVITY * (deltaTime / 16);
-            gameState.player.y += gameState.player.vy * (deltaTime / 16);
-
-            // Check collisions
-            checkCollisions();
-
-            // Check boundaries
-            if (gameState.player.y + gameState.player.size > elements.canvas.height - 10) {{
-                endGame();
-            }}
-            if (gameState.player.y < 0) {{
-                gameState.player.y = 0;
-                gameState.player.vy = 0;
-            }}
-        }}
-
-        function checkCollisions() {{
-            const playerRect = {{
-                x: gameState.player.x,
-                y: gameState.player.y,
-                width: gameState.player.size,
-                height: gameState.player.size
-            }};
-
-            for (const pipe of gameState.pipes) {{
-                const pipeWidth = elements.canvas.width * 0.08;
-                const topHeight = pipe.center - (CONFIG.PIPE_GAP / 2);
-                const bottomY = pipe.center + (CONFIG.PIPE_GAP / 2);
-
-                // Score point
-                if (!pipe.scored && pipe.x + pipeWidth < gameState.player.x) {{
-                    pipe.scored = true;
-                    gameState.score++;
-                    elements.score.textContent = gameState.score;
-                }}
-
-                // Collision detection
-                const topPipe = {{ x: pipe.x, y: 0, width: pipeWidth, height: topHeight }};
-                const bottomPipe = {{ x: pipe.x, y: bottomY, width: pipeWidth, height: elements.canvas.height - bottomY }};
-
-                if (checkRectCollision(playerRect, topPipe) || checkRectCollision(playerRect, bottomPipe)) {{
-                    endGame();
-                    return;
-                }}
-            }}
-        }}
-
-        function checkRectCollision(rect1, rect2) {{
-            return rect1.x < rect2.x + rect2.width &&
-                   rect1.x + rect1.width > rect2.x &&
-                   rect1.y < rect2.y + rect2.height &&
-                   rect1.y + rect1.height > rect2.y;
-        }}
-
-        function flap() {{
-            if (!gameState.gameRunning || gameState.gameOver || gameState.countdownActive) return;
-            gameState.player.vy = CONFIG.JUMP_POWER;
-        }}
-
-        // Rendering
-        function render() {{
-            // Clear canvas
-            ctx.fillStyle = '#000';
-            ctx.fillRect(0, 0, elements.canvas.width, elements.canvas.height);
-
-            // Draw background
-            if (gameState.images.bg) {{
-                ctx.drawImage(gameState.images.bg, 0, 0, elements.canvas.width, elements.canvas.height);
-            }} else {{
-                const gradient = ctx.createLinearGradient(0, 0, elements.canvas.width, elements.canvas.height);
-                gradient.addColorStop(0, '#1e3c72');
-                gradient.addColorStop(1, '#2a5298');
-                ctx.fillStyle = gradient;
-                ctx.fillRect(0, 0, elements.canvas.width, elements.canvas.height);
-            }}
-
-            // Draw pipes
-            gameState.pipes.forEach(pipe => {{
-                const pipeWidth = elements.canvas.width * 0.08;
-                const topHeight = pipe.center - (CONFIG.PIPE_GAP / 2);
-
-                if (gameState.images.pipe) {{
-                    ctx.drawImage(gameState.images.pipe, pipe.x, 0, pipeWidth, topHeight);
-                    ctx.drawImage(gameState.images.pipe, pipe.x, pipe.center + (CONFIG.PIPE_GAP / 2), pipeWidth, elements.canvas.height - (pipe.center + (CONFIG.PIPE_GAP / 2)));
-                }} else {{
-                    const pipeGradient = ctx.createLinearGradient(pipe.x, 0, pipe.x + pipeWidth, 0);
-                    pipeGradient.addColorStop(0, '#2ecc71');
-                    pipeGradient.addColorStop(1, '#27ae60');
-                    ctx.fillStyle = pipeGradient;
-                    ctx.fillRect(pipe.x, 0, pipeWidth, topHeight);
-                    ctx.fillRect(pipe.x, pipe.center + (CONFIG.PIPE_GAP / 2), pipeWidth, elements.canvas.height - (pipe.center + (CONFIG.PIPE_GAP / 2)));
-                }}
-            }});
-
-            // Draw player
-            if (gameState.images.player) {{
-                ctx.drawImage(gameState.images.player, gameState.player.x, gameState.player.y, gameState.player.size, gameState.player.size);
-            }} else {{
-                ctx.fillStyle = '#f1c40f';
-                ctx.fillRect(gameState.player.x, gameState.player.y, gameState.player.size, gameState.player.size);
-            }}
-        }}
-
-        function renderMenu() {{
-            render();
-        }}
-
-        // Game Loop
-        function gameLoop(currentTime) {{
-            const deltaTime = currentTime - gameState.lastTime;
-            gameState.lastTime = currentTime;
-
-            update(deltaTime);
-            render();
-
-            if (gameState.gameRunning && !gameState.gameOver) {{
-                requestAnimationFrame(gameLoop);
-            }}
-        }}
-
-        // Utility Functions
-        function resizeCanvas() {{
-            elements.canvas.width = Math.min(window.innerWidth * 0.95, 900);
-            elements.canvas.height = Math.min(window.innerHeight * 0.7, 600);
-            if (!gameState.gameRunning) {{
-                renderMenu();
-            }}
-        }}
-
-        // Start the game when page loads
-        window.addEventListener('load', initGame);
-    </script>
-</body>
-</html>
-'''
+uploads = {
+    "bg": up_bg,
+    "player": up_player,
+    "pipe": up_pipe,
+    "bag": up_bag,
+    "menu": up_menu_music,
+    "ingame": up_ingame_music,
+    "gameover": up_gameover_music,
+    "sfx_flap": up_sfx_flap,
+    "sfx_score": up_sfx_score,
+    "sfx_countdown": up_sfx_countdown,
+    "sfx_crash": up_sfx_crash,
+    "sfx_ending": up_sfx_ending,
+}
+default_assets = asset_catalog.defaults()
+playlist = asset_catalog.playlist()
+with tracing.span("uploads"):
+    stored = stored_uploads(uploads)
+with tracing.span("assets"):
+    game_assets = build_game_assets(stored, default_assets, asset_cache, asset_store, asset_base, playlist)
+
+# --------- Premium Game ---------
+game_config = {
+    "game_speed": game_speed,
+    # Replays store gravity in hundredths; keep the game on exactly that value
+    "gravity": round(gravity_strength, 2),
+    "jump_power": jump_power,
+    "pipe_gap": pipe_gap,
+}
+
+# Scores reported by the game since the last rerun
+@st.cache_resource
+def get_leaderboard():
+    return Leaderboard(LEADERBOARD_DB)
+
+leaderboard = get_leaderboard()
+player = (player_name or "").strip() or "Anonymous"
+
+def read_runs(runs):
+    # Malformed messages become (None, None) and fail verification
+    for run in runs:
+        try:
+            yield read_run(run)
+        except ReplayError:
+            yield None, None
+
+def record_runs(runs):
+    submissions = list(read_runs(runs))
+    verdicts = verify_runs(submissions)
+    for (log, score), ok in zip(submissions, verdicts):
+        if not ok:
+            st.toast("⚠️ That run could not be verified, so it was not ranked.")
+            continue
+        if any(kind == EVENT_CONFIG for _, kind, _, _ in log.events):
+            st.toast("🛠️ Settings changed mid-run, so that score is not ranked.")
+            continue
+        if not leaderboard.submit(player, score, log.steps, log.config, log_digest(log)):
+            st.toast("♻️ That run is already on the leaderboard.")
+            continue
+        st.toast(f"🏆 Score {score} saved for {player}!")
+
+@st.cache_resource
+def get_perf_stats():
+    # Frame-time histograms from every session, grouped by profile
+    return PerfStats()
+
+perf_stats = get_perf_stats()
+
+def record_perf(reports, custom):
+    # Profile: the config the frames were played at, as the game reports it,
+    # and which assets were custom
+    for summary in reports if isinstance(reports, list) else ():
+        if not isinstance(summary, dict):
+            continue
+        try:
+            config = read_config(summary.get("config"))
+        except ReplayError:
+            continue
+        perf_stats.add(config + (custom,), summary)
+
+with tracing.span("messages") as span:
+    messages, ack = pending_messages()
+    span.add(count=len(messages))
+    runs = [m for m in messages if m.get("type") == "run"]
+    if runs:
+        record_runs(runs)
+    custom = tuple(sorted(role for role, fileobj in uploads.items() if fileobj))
+    for m in messages:
+        if m.get("type") == "perf":
+            record_perf(m.get("perf"), custom)
+    # Only now, with every run recorded, may the game forget these messages
+    acknowledge(ack)
 
 # Render the game
-st.components.v1.html(game_html, height=800, scrolling=False)
+with tracing.span("component") as span:
+    if span:
+        # Size of the args message this rerun sends to the game
+        span.add(bytes=len(json.dumps({"config": game_config, "assets": game_assets, "ack": ack})))
+    flappy_game(game_config, game_assets, height=800, ack=ack)
+
+# Leaderboard
+with tracing.span("leaderboard"):
+    config_key = (game_speed, round(gravity_strength * 100), jump_power, pipe_gap)
+    top_runs = leaderboard.top(config_key)
+    best = leaderboard.player_best(player)
+st.markdown("## 🏆 Class Leaderboard")
+st.caption(f"Speed {game_speed} · Gravity {gravity_strength:.2f} · Jump {jump_power} · Gap {pipe_gap}"
+           + (f" · Your best: {best}" if best is not None else ""))
+if top_runs:
+    st.table([{"Player": e.player, "Score": e.score, "Time (s)": round(e.steps / 60, 1)} for e in top_runs])
+else:
+    st.info("No scores for these settings yet. Be the first!")
+
+# Frame times across all sessions
+with st.sidebar.expander("📈 Game Performance"):
+    perf_rows = perf_stats.rows()
+    if perf_rows:
+        st.caption("Milliseconds per frame; the budget at 60 Hz is 16.7 ms.")
+        st.dataframe([{
+            "Settings": f"{speed}/{gravity / 100:.2f}/{jump}/{gap}",
+            "Custom": ", ".join(custom) or "-",
+            "Mode": mode,
+            "Sessions": stats["sessions"],
+            "Frames": stats["frames"],
+            "p50": stats["frame_p50"],
+            "p95": stats["frame_p95"],
+            "p99": stats["frame_p99"],
+            "Update p95": stats["update_p95"],
+            "Render p95": stats["render_p95"],
+            "Dropped %": stats["dropped_pct"],
+            "Heap MB": stats["heap_mb"],
+        } for (speed, gravity, jump, gap, custom, mode), stats in perf_rows], hide_index=True)
+    else:
+        st.caption("No frame timings reported yet. Play a round to collect some.")
 
 # Features Section
 st.markdown("---")
@@ -851,3 +392,23 @@ st.markdown("""
 4. **Avoid obstacles** and score points
 5. **Enjoy** your customized gaming experience!
 """)
+
+# Rerun breakdown for ?debug=trace
+trace.finish()
+if show_trace:
+    with st.sidebar.expander("🔬 Rerun Timings", expanded=True):
+        reruns = tracer.recent(trace_session)
+        st.caption("This session's last reruns, in ms per stage.")
+        st.dataframe([{
+            "Rerun": r["rerun"],
+            "Total": round(r["ms"], 1),
+            **{s["name"]: round(s["ms"], 1) for s in r["spans"] if s["depth"] == 0 and s["ms"] is not None},
+        } for r in reruns], hide_index=True)
+        st.caption("Latest rerun by span; bytes read or sent, cache hits and misses.")
+        st.dataframe([{
+            "Span": "  " * s["depth"] + s["name"],
+            "ms": s["ms"],
+            "Bytes": s.get("bytes", 0),
+            "Hits": s.get("hits", 0),
+            "Misses": s.get("misses", 0),
+        } for s in reruns[0]["spans"]], hide_index=True)
@@ -0,0 +1,46 @@
+// Plays seeded runs through the game core of flappy/frontend/index.html and
+// prints their logs as JSON, for tests/test_replay.py:
+//
+//     node tests/fixtures/js_runs.js > tests/fixtures/js_runs.json
+//
+// A simple bot flaps below each gap and now and then retunes speed and
+// gravity mid-run, so the logs hold both kinds of event.
+const fs = require('fs');
+const path = require('path');
+
+const RUNS = 300;
+const html = fs.readFileSync(path.join(__dirname, '..', '..', 'flappy', 'frontend', 'index.html'), 'utf8');
+const core = html.match(/<script id="gameCore">([\s\S]*?)<\/script>/)[1];
+
+const play = `
+let counter = 1;
+newSeed = () => Math.imul(counter++, 2654435761) >>> 0;
+attachCanvas({ width: 0, height: 0, getContext: () => ({}) });
+view.width = 900;
+view.height = 600;
+const runs = [];
+host.gameOver = (score, run) => runs.push(run);
+const rnd = mulberry32(12345);
+const speed = () => 1 + Math.floor(rnd() * 10);
+const gravity = () => Math.round((0.1 + rnd() * 0.9) * 100) / 100;
+for (let r = 0; r < ${RUNS}; r++) {
+    const config = { game_speed: speed(), gravity: gravity(), jump_power: 5 + Math.floor(rnd() * 16), pipe_gap: 120 + Math.floor(rnd() * 131) };
+    applyConfig(config);
+    gameState.gameRunning = true;
+    gameState.gameOver = false;
+    resetGame();
+    for (let guard = 0; !gameState.gameOver && guard < 20000; guard++) {
+        let center = gameState.world.height / 2;
+        for (let i = 0; i < pipes.count; i++) {
+            const k = (pipes.head + i) & PIPE_MASK;
+            if (pipes.x[k] + gameState.world.width * 0.08 > 100) { center = pipes.center[k]; break; }
+        }
+        if (gameState.player.y + 50 > center + CONFIG.PIPE_GAP / 2 - 20 && gameState.player.vy > 0) flap(0);
+        if (rnd() < 0.002) applyConfig({ ...config, game_speed: speed(), gravity: gravity() });
+        step(0);
+    }
+    runs[runs.length - 1].config = config;
+}
+process.stdout.write('[\\n' + runs.map(run => JSON.stringify(run)).join(',\\n') + '\\n]\\n');
+`;
+eval(core + '\n' + play);
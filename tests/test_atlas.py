@@ -0,0 +1,73 @@
+"""Packing sprites into the atlas and the frame map that points into it."""
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from flappy.atlas import PAD, build_atlas, pack, split_sheet
+
+
+def noise(w, h, seed):
+    # Alpha never 0: encoders may rewrite the colour of invisible pixels
+    rnd = random.Random(seed)
+    return Image.frombytes("RGBA", (w, h), bytes(
+        value for _ in range(w * h) for value in (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256),
+                                                  rnd.randrange(1, 256))
+    ))
+
+
+def png(img):
+    out = io.BytesIO()
+    img.save(out, "PNG")
+    return out.getvalue()
+
+
+def overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_packed_sprites_and_gutters_never_overlap(seed):
+    rnd = random.Random(seed)
+    sizes = [(rnd.randint(1, 120), rnd.randint(1, 600)) for _ in range(rnd.randint(1, 30))]
+    positions, (width, height) = pack(sizes, max_width=400)
+    assert width <= 400
+    boxes = [(x - PAD, y - PAD, x + w + PAD, y + h + PAD) for (x, y), (w, h) in zip(positions, sizes)]
+    for i, box in enumerate(boxes):
+        assert box[0] >= 0 and box[1] >= 0 and box[2] <= width and box[3] <= height
+        assert not any(overlaps(box, other) for other in boxes[i + 1:])
+
+
+def test_frame_map_points_at_the_sprites():
+    frames = [noise(40, 40, seed) for seed in range(3)]
+    sheet = Image.new("RGBA", (120, 40))
+    for i, frame in enumerate(frames):
+        sheet.paste(frame, (40 * i, 0))
+    assert [f.tobytes() for f in split_sheet(sheet)] == [f.tobytes() for f in frames]
+    bag, pipe = noise(30, 30, 10), noise(60, 200, 11)
+
+    data, mime, frame_map = build_atlas([png(sheet)], png(bag), png(pipe))
+    atlas = Image.open(io.BytesIO(data))
+    assert mime == f"image/{atlas.format.lower()}"
+    atlas = atlas.convert("RGBA")
+    assert list(atlas.size) == frame_map["size"]
+    assert frame_map["animations"]["idle"]["frames"] == [0, 1, 2]
+
+    sprites = {f"player_{i}": frame for i, frame in enumerate(frames)}
+    sprites.update(bag=bag, pipe=pipe)
+    assert set(frame_map["frames"]) == set(sprites)
+    for name, img in sprites.items():
+        x, y, w, h = frame_map["frames"][name]
+        assert (w, h) == img.size
+        # Lossless: exactly the uploaded pixels
+        assert atlas.crop((x, y, x + w, y + h)).tobytes() == img.tobytes(), name
+        # The gutter repeats the sprite's edge pixels
+        assert atlas.crop((x, y - 1, x + w, y)).tobytes() == img.crop((0, 0, w, 1)).tobytes()
+        assert atlas.crop((x, y + h, x + w, y + h + 1)).tobytes() == img.crop((0, h - 1, w, h)).tobytes()
+        assert atlas.crop((x - 1, y, x, y + h)).tobytes() == img.crop((0, 0, 1, h)).tobytes()
+        assert atlas.crop((x + w, y, x + w + 1, y + h)).tobytes() == img.crop((w - 1, 0, w, h)).tobytes()
+
+
+def test_nothing_to_pack():
+    assert build_atlas([b"not an image"]) is None
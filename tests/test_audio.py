@@ -0,0 +1,83 @@
+"""Playlist tracks past the first are transcoded in the background."""
+import os
+import threading
+import time
+
+import pytest
+
+from flappy import audio
+from flappy.assets import build_game_assets
+from flappy.cache import AssetCache
+from flappy.serving import StaticAssetStore
+
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch, tmp_path):
+    """Stand-in transcoder: background transcodes wait for ``gate``."""
+    monkeypatch.setattr(audio, "FFMPEG", "ffmpeg")
+    monkeypatch.setattr(audio, "AUDIO_FORMAT", "ogg")
+    monkeypatch.setattr(audio, "CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(audio, "_pending", set())
+    monkeypatch.setattr(audio, "_failed", set())
+    gate = threading.Event()
+    calls = []
+
+    def transcode(raw, mime, role):
+        path = audio._cache_path(raw, role)
+        if not os.path.exists(path):
+            calls.append(raw)
+            if threading.current_thread().name.startswith("flappy-audio"):
+                gate.wait(5)
+            if raw.startswith(b"broken"):
+                return raw, mime
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"ogg:" + raw)
+        with open(path, "rb") as f:
+            return f.read(), "audio/ogg"
+
+    monkeypatch.setattr(audio, "transcode_audio", transcode)
+    yield gate, calls
+    gate.set()
+
+
+def settle():
+    deadline = time.monotonic() + 5
+    while audio._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not audio._pending
+
+
+def test_first_page_waits_for_one_track(fake_ffmpeg, tmp_path):
+    gate, calls = fake_ffmpeg
+    playlist = []
+    for i in range(4):
+        path = tmp_path / f"track{i}.mp3"
+        path.write_bytes(b"mp3-%d" % i)
+        playlist.append(str(path))
+    cache, store = AssetCache(), StaticAssetStore(str(tmp_path / "assets"))
+
+    assets = build_game_assets({}, {"ingame": playlist[0]}, cache, store, "/", playlist)
+    tracks = assets["INGAME_PLAYLIST"]
+    assert assets["INGAME_MUSIC_URL"] == tracks[0]
+    assert tracks[0].endswith(".ogg")
+    # The rest go out as they are for now
+    assert [url.rsplit(".", 1)[1] for url in tracks[1:]] == ["mp3"] * 3
+    assert calls == [b"mp3-0"]
+
+    gate.set()
+    settle()
+    assets = build_game_assets({}, {"ingame": playlist[0]}, cache, store, "/", playlist)
+    assert assets["INGAME_PLAYLIST"][0] == tracks[0]
+    assert all(url.endswith(".ogg") for url in assets["INGAME_PLAYLIST"])
+    assert sorted(calls) == [b"mp3-%d" % i for i in range(4)]
+
+
+def test_failed_background_transcode_ships_the_original(fake_ffmpeg):
+    gate, calls = fake_ffmpeg
+    gate.set()
+    with pytest.raises(audio.TranscodePending):
+        audio.transcode_later(b"broken", "audio/mpeg", "ingame")
+    settle()
+    assert audio.transcode_later(b"broken", "audio/mpeg", "ingame") == (b"broken", "audio/mpeg")
+    assert calls == [b"broken"]
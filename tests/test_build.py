@@ -0,0 +1,46 @@
+"""The built frontend: minified scripts must still parse."""
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from flappy.build import build_frontend, minify_js
+
+SCRIPT = re.compile(r"<script\b([^>]*)>(.*?)</script>", re.S)
+
+
+def test_minify_keeps_literals_and_line_breaks():
+    code = (
+        "const url = 'http://x' // scheme\n"
+        "    const re = /a\\/\\/b/g; /* block */ const t = `//${ {a: `/*`}.a } */`\n"
+        "/* one\n   two */\n"
+        "return a / b // ratio\n"
+    )
+    assert minify_js(code) == (
+        "const url = 'http://x'\n"
+        "const re = /a\\/\\/b/g;   const t = `//${ {a: `/*`}.a } */`\n"
+        "return a / b"
+    )
+
+
+def test_division_after_postfix_increment():
+    assert minify_js("x = i++ / 2\n") == "x = i++ / 2"
+    assert minify_js("x = i++ / 2 // half\ny = 1 /* a/b */\n") == "x = i++ / 2\ny = 1"
+    assert minify_js("x = i-- / 2 + /a\\/b/.source.length\n") == "x = i-- / 2 + /a\\/b/.source.length"
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+@pytest.mark.parametrize("render_mode", ["main", "worker"])
+def test_built_scripts_parse(tmp_path, render_mode):
+    out_dir = build_frontend({"render_mode": render_mode}, build_dir=str(tmp_path))
+    with open(os.path.join(out_dir, "index.html"), encoding="utf-8") as f:
+        page = f.read()
+    scripts = [body for attrs, body in SCRIPT.findall(page) if "application/json" not in attrs]
+    assert len(scripts) == 3
+    for i, body in enumerate(scripts):
+        path = tmp_path / f"script{i}.js"
+        path.write_text(body, encoding="utf-8")
+        result = subprocess.run(["node", "--check", str(path)], capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
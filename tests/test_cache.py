@@ -0,0 +1,60 @@
+"""The process-wide LRU cache of encoded assets."""
+from flappy.assets import fileobj_to_data_url, resolve_asset
+from flappy.cache import AssetCache
+
+
+def test_least_recently_used_entries_go_first():
+    cache = AssetCache(max_bytes=100)
+    cache.put("a", b"a" * 40)
+    cache.put("b", b"b" * 40)
+    assert cache.get("a") == b"a" * 40
+    cache.put("c", b"c" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["used_bytes"] == 80
+    assert stats["evictions"] == 1
+
+
+def test_byte_budget_counts_declared_sizes_and_replacements():
+    cache = AssetCache(max_bytes=100)
+    cache.put("a", "data-url", size=60)
+    cache.put("a", "smaller", size=30)
+    assert cache.stats()["used_bytes"] == 30
+    cache.put("b", "big", size=70)
+    stats = cache.stats()
+    assert (stats["entries"], stats["used_bytes"], stats["evictions"]) == (2, 100, 0)
+    cache.put("c", "one more", size=1)
+    assert cache.get("a") is None
+    assert cache.stats()["used_bytes"] == 71
+
+
+def test_entries_over_budget_are_returned_but_not_kept():
+    cache = AssetCache(max_bytes=10)
+    cache.put("small", b"12345")
+    assert cache.put("huge", b"x" * 11) == b"x" * 11
+    assert cache.get("huge") is None
+    assert cache.get("small") == b"12345"
+
+
+def test_each_resolve_counts_once(tmp_path):
+    path = tmp_path / "pipe.png"
+    path.write_bytes(b"not really a png")
+    cache = AssetCache()
+    url = fileobj_to_data_url(None, str(path), cache)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
+    assert fileobj_to_data_url(None, str(path), cache) == url
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_value_failing_its_check_is_a_miss(tmp_path):
+    path = tmp_path / "pipe.png"
+    path.write_bytes(b"not really a png")
+    cache = AssetCache()
+    encode = lambda raw, mime, digest: digest  # noqa: E731
+    swept = set()
+    check = lambda name: name not in swept  # noqa: E731
+    name = resolve_asset(None, str(path), cache, encode, "file", check=check)
+    swept.add(name)
+    assert resolve_asset(None, str(path), cache, encode, "file", check=check) == name
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 2)
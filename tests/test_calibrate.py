@@ -0,0 +1,88 @@
+"""Difficulty presets and the no-way-through warning, from the calibration table."""
+import numpy as np
+import pytest
+
+from flappy.calibrate import (
+    DEFAULT_CONFIG, Calibration, PlanningBot, Row, crossing_search, grid_values, load_table,
+)
+from flappy.sim import GameBatch
+
+
+def assert_monotonic(calibration):
+    presets = calibration.presets()
+    assert list(presets) == ["Easy", "Normal", "Hard"]
+    easy, normal, hard = (calibration.rows[presets[name]] for name in presets)
+    assert easy.clear >= normal.clear >= hard.clear
+    assert easy.game_speed < normal.game_speed < hard.game_speed
+    assert easy.pipe_gap > normal.pipe_gap > hard.pipe_gap
+    # Hard is never easier than what the game starts with
+    assert hard.game_speed > DEFAULT_CONFIG[0] and hard.pipe_gap < DEFAULT_CONFIG[3]
+
+
+@pytest.fixture(scope="module")
+def shipped():
+    calibration = load_table()
+    if calibration is None:
+        pytest.skip("no calibration table")
+    return calibration
+
+
+def test_shipped_presets_get_harder(shipped):
+    assert_monotonic(shipped)
+
+
+def test_normal_is_no_easier_than_the_defaults(shipped):
+    normal = shipped.rows[shipped.presets()["Normal"]]
+    assert normal.game_speed >= DEFAULT_CONFIG[0]
+    assert normal.pipe_gap <= DEFAULT_CONFIG[3]
+
+
+def test_defaults_are_not_flagged(shipped):
+    assert shipped.impossible(DEFAULT_CONFIG) is False
+
+
+def test_bot_clears_the_defaults():
+    speed, gravity, jump, gap = DEFAULT_CONFIG
+    n = 16
+    batch = GameBatch(n, game_speed=speed, gravity=gravity / 100, jump_power=jump, pipe_gap=gap,
+                      seed=np.arange(1, n + 1))
+    batch.run(PlanningBot(n), max_frames=60 * 60)
+    assert (batch.frames >= 60 * 60).mean() >= 0.9
+
+
+def grid(clear, crossable=1):
+    return Calibration([
+        Row(speed, gravity, jump, gap, clear, 60.0, 0, 0, 0, crossable)
+        for speed in (2, 3) for gravity in (40, 50) for jump in (11, 12) for gap in (170, 180)
+    ])
+
+
+def test_impossible_between_grid_points():
+    rows = [Row(3, 50, 12, 180, 0.0, 1.0, 0, 0, 0, 0), Row(3, 50, 12, 190, 0.0, 1.0, 0, 0, 0, 0),
+            Row(3, 50, 12, 200, 0.5, 30.0, 0, 5, 9, 1)]
+    calibration = Calibration(rows)
+    assert calibration.impossible((3, 50, 12, 185)) is True
+    # One corner has a way through
+    assert calibration.impossible((3, 50, 12, 195)) is False
+    # Outside the grid, or a cell the sweep did not cover: not calibrated
+    assert calibration.impossible((3, 50, 12, 250)) is None
+    assert calibration.impossible((4, 50, 12, 180)) is None
+    assert grid(0.0, crossable=0).impossible((3, 45, 12, 175)) is True
+    assert len(grid(1.0).corners((2, 45, 11, 175))) == 4
+
+
+def test_crossing_search():
+    # The defaults need a well-timed flap; a jump of 20 overshoots a 120 gap
+    assert crossing_search(3, 50, [(12, 180), (20, 120)]).tolist() == [True, False]
+
+
+def test_presets_get_harder_when_clear_rate_is_not_monotonic():
+    # Like the bot in the shipped table: pipes crowd together at speed 1, so
+    # it clears less often there than at speeds 2 and 3
+    base = {1: 0.0, 2: 0.9, 3: 0.95, 4: 0.6, 5: 0.5}
+    rows = []
+    for speed in grid_values("game_speed", 1):
+        for gap in grid_values("pipe_gap", 10):
+            clear = min(max(base.get(speed, 0) + (gap - 180) / 400, 0), 1)
+            rows.append(Row(speed, 50, 12, gap, round(clear, 3), 60.0, 0, 0, 0, 1))
+    assert_monotonic(Calibration(rows))
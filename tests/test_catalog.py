@@ -0,0 +1,62 @@
+"""Sniffing and checking the default assets shipped next to the app."""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from flappy.catalog import MIN_BYTES, check_asset, sniff
+
+
+def png_bytes():
+    pixels = np.random.default_rng(0).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, "PNG")
+    return out.getvalue()
+
+
+def id3_tag(body_size):
+    # ID3v2.3 header; the size is four 7-bit bytes and excludes the header
+    size = bytes((body_size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + size + b"\0" * body_size
+
+
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\0" * 413
+
+
+@pytest.mark.parametrize("head, mime", [
+    (b"\x89PNG\r\n\x1a\n....", "image/png"),
+    (b"\xff\xd8\xff\xe0", "image/jpeg"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF\0\0\0\0WEBPVP8 ", "image/webp"),
+    (b"RIFF\0\0\0\0WAVEfmt ", "audio/wav"),
+    (b"OggS\0", "audio/ogg"),
+    (b"\0\0\0\x20ftypM4A ", "audio/mp4"),
+    (b"ID3\x04\0", "audio/mpeg"),
+    (b"\xff\xfb\x90\x64", "audio/mpeg"),
+    (b"<html>", None),
+    (b"", None),
+])
+def test_sniff_reads_the_magic_bytes(head, mime):
+    assert sniff(head) == mime
+
+
+def check(tmp_path, data, name="asset"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return check_asset(str(path), data[:64], sniff(data[:64]), len(data))
+
+
+def test_images_must_decode_in_full(tmp_path):
+    raw = png_bytes()
+    assert check(tmp_path, raw)
+    assert not check(tmp_path, raw[: len(raw) // 2])
+    assert not check(tmp_path, raw[: MIN_BYTES - 1])
+
+
+def test_mp3s_need_audio_after_their_tags(tmp_path):
+    assert check(tmp_path, id3_tag(64) + MP3_FRAME * 4)
+    assert check(tmp_path, MP3_FRAME * 4)
+    # Cover art and tags only
+    assert not check(tmp_path, id3_tag(4096))
+    assert not check(tmp_path, id3_tag(4096) + MP3_FRAME[:100])
@@ -0,0 +1,38 @@
+"""Reading the game's messages out of the component value."""
+import pytest
+import streamlit as st
+
+from flappy.component import acknowledge, pending_messages
+
+
+@pytest.fixture
+def value():
+    def set_value(value):
+        st.session_state["flappy_game"] = value
+    yield set_value
+    for key in ("flappy_game", "flappy_game_ack"):
+        st.session_state.pop(key, None)
+
+
+def test_acknowledged_messages_are_not_offered_again(value):
+    value({"instance": "a", "messages": [{"seq": 1, "type": "run"}, {"seq": 2, "type": "perf"}]})
+    messages, ack = pending_messages()
+    assert [m["seq"] for m in messages] == [1, 2]
+    acknowledge(ack)
+    assert pending_messages()[0] == []
+    # A new iframe numbers its messages from scratch
+    value({"instance": "b", "messages": [{"seq": 1, "type": "run"}]})
+    assert len(pending_messages()[0]) == 1
+
+
+@pytest.mark.parametrize("bad", [None, "junk", ["a"], {"messages": "junk"}, {"messages": 5}])
+def test_malformed_value_is_empty(value, bad):
+    value(bad)
+    assert pending_messages()[0] == []
+
+
+def test_malformed_messages_are_skipped(value):
+    value({"instance": "a", "messages": [1, "x", None, {"seq": "z"}, {"seq": True}, {"seq": 3, "type": "run"}]})
+    messages, ack = pending_messages()
+    assert messages == [{"seq": 3, "type": "run"}]
+    assert ack == {"instance": "a", "seq": 3}
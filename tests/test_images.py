@@ -0,0 +1,27 @@
+"""Re-encoding uploaded and default images for the game."""
+import io
+
+import pytest
+from PIL import Image
+
+from flappy.images import HAS_WEBP, IMAGE_TARGETS, prepare_image
+
+
+def png_bytes(size):
+    out = io.BytesIO()
+    Image.new("RGB", size, (30, 144, 255)).save(out, "PNG")
+    return out.getvalue()
+
+
+@pytest.mark.skipif(not HAS_WEBP, reason="Pillow built without WebP")
+def test_images_are_downscaled_to_webp():
+    data, mime = prepare_image(png_bytes((1800, 1200)), "image/png", "bg")
+    assert mime == "image/webp"
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.format == "WEBP"
+        assert img.size == IMAGE_TARGETS["bg"]
+
+
+def test_undecodable_images_pass_through():
+    raw = b"\x89PNG\r\n\x1a\n" + b"not really a png" * 32
+    assert prepare_image(raw, "image/png", "player") == (raw, "image/png")
@@ -0,0 +1,53 @@
+"""The SQLite leaderboard and its write-behind queue."""
+from flappy.leaderboard import Leaderboard
+
+CONFIG = (3, 50, 12, 180)
+
+
+def test_a_log_only_ranks_once(tmp_path):
+    board = Leaderboard(str(tmp_path / "lb.db"), flush_interval=0)
+    assert board.submit("ann", 5, 900, CONFIG, "log-1")
+    # Still queued, then on disk
+    assert not board.submit("bob", 5, 900, CONFIG, "log-1")
+    board.flush()
+    assert not board.submit("bob", 5, 900, CONFIG, "log-1")
+    assert [e.player for e in board.top(CONFIG)] == ["ann"]
+
+
+def test_cold_reads_merge_unwritten_runs(tmp_path):
+    path = str(tmp_path / "lb.db")
+    first = Leaderboard(path, flush_interval=0)
+    first.submit("ann", 3, 600, CONFIG, "log-1")
+    first.flush()
+
+    # A long batch window keeps the next run queued while we read
+    board = Leaderboard(path, flush_interval=30)
+    board.submit("bob", 7, 1200, CONFIG, "log-2")
+    board.submit("cy", 1, 200, (4, 50, 12, 180), "log-3")
+    assert board._unwritten
+    assert [(e.player, e.score) for e in board.top(CONFIG)] == [("bob", 7), ("ann", 3)]
+    assert board.player_best("bob") == 7
+    assert board.player_best("ann") == 3
+    assert not board.submit("dee", 7, 1200, CONFIG, "log-2")
+
+
+def test_failed_batch_leaves_no_trace(tmp_path):
+    path = str(tmp_path / "lb.db")
+    board = Leaderboard(path, flush_interval=0)
+    board._reader.execute(
+        "CREATE TRIGGER reject BEFORE INSERT ON runs WHEN NEW.player = 'eve'"
+        " BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+    )
+    # Warm the caches so the submit lands in them
+    assert board.top(CONFIG) == []
+    assert board.player_best("eve") is None
+    board.submit("eve", 9, 900, CONFIG, "log-1")
+    assert board.player_best("eve") == 9
+    board.flush()
+    assert board.top(CONFIG) == []
+    assert board.player_best("eve") is None
+    # The run was never saved, so it may be submitted again
+    board._reader.execute("DROP TRIGGER reject")
+    assert board.submit("eve", 9, 900, CONFIG, "log-1")
+    board.flush()
+    assert [e.player for e in Leaderboard(path).top(CONFIG)] == ["eve"]
@@ -0,0 +1,71 @@
+"""Frame-time histograms posted by the game and their per-profile aggregate."""
+import json
+import os
+import re
+
+from flappy import perf
+from flappy.build import FRONTEND_DIR
+from flappy.perf import BINS, Histogram, PerfStats
+
+PROFILE = (3, 50, 12, 180, ())
+
+
+def report(counts, session="s1", bin_ms=0.5, **fields):
+    hist = {"bin": bin_ms, "counts": counts, "over": 0, "max": 0}
+    return dict({"hist": {"frame": hist}, "session": session, "frames": sum(counts)}, **fields)
+
+
+def test_bins_match_the_frontend():
+    with open(os.path.join(FRONTEND_DIR, "index.html"), encoding="utf-8") as f:
+        match = re.search(r"const PERF_BINS = (\{.*?\});", f.read())
+    js = json.loads(re.sub(r"(\w+):", r'"\1":', match.group(1)))
+    assert {name: tuple(spec) for name, spec in js.items()} == BINS
+
+
+def test_percentile_is_the_upper_bin_edge():
+    hist = Histogram(0.5, 10)
+    assert hist.percentile(50) is None
+    assert hist.merge({"bin": 0.5, "counts": [0, 50, 0, 49], "over": 1, "max": 30})
+    assert hist.percentile(50) == 1.0
+    assert hist.percentile(99) == 2.0
+    # Past the last bin: the largest frame seen
+    assert hist.percentile(100) == 30.0
+
+
+def test_merge_rejects_foreign_histograms():
+    hist = Histogram(0.5, 3)
+    assert not hist.merge({"bin": 0.1, "counts": [1]})
+    assert not hist.merge({"bin": 0.5, "counts": [1, 1, 1, 1]})
+    assert not hist.merge("junk")
+    assert hist.merge({"bin": 0.5, "counts": [-5, "x", 2], "over": True})
+    assert hist.counts == [0, 0, 2] and hist.over == 0
+
+
+def test_reports_merge_per_profile():
+    stats = PerfStats()
+    assert stats.add(PROFILE, report([0, 10, 0, 10]))
+    assert stats.add(PROFILE, report([0, 0, 0, 20], session="s2", dropped=10))
+    assert stats.add(PROFILE, report([10], mode="worker"))
+    assert not stats.add(PROFILE, {"hist": "junk"})
+    (worker, worker_stats), (main, main_stats) = stats.rows()
+    assert worker == PROFILE + ("worker",) and main == PROFILE + ("main",)
+    assert main_stats["sessions"] == 2 and main_stats["frames"] == 40
+    assert main_stats["frame_p50"] == 2.0
+    assert main_stats["dropped_pct"] == 20.0
+    assert worker_stats["frame_p95"] == 0.5
+
+
+def test_profiles_and_sessions_are_bounded(monkeypatch):
+    monkeypatch.setattr(perf, "MAX_SESSIONS", 4)
+    stats = PerfStats(max_profiles=2)
+    for config in range(3):
+        stats.add((config,), report([1]))
+    assert [key for key, _ in stats.rows()] == [(2, "main"), (1, "main")]
+
+    for i in range(10):
+        stats.add(PROFILE, report([1], session=f"s{i}"))
+        # A session reporting again is not a new one
+        stats.add(PROFILE, report([1], session=f"s{i}"))
+    entry = stats._profiles[PROFILE + ("main",)]
+    assert entry.sessions == 10
+    assert len(entry.recent) == 4
@@ -0,0 +1,90 @@
+"""Replays of run logs written by the game's JS core (tests/fixtures/js_runs.js)."""
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from flappy.replay import (
+    CONFIG_PARAMS, MAX_STEPS, ReplayError, config_code, decode_log, encode_log, max_steps, read_config, read_run,
+    replay_logs, replay_one, verify_runs,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_runs():
+    with open(os.path.join(FIXTURES, "js_runs.json")) as f:
+        return json.load(f)
+
+
+RUNS = load_runs()
+
+
+def test_fixtures_cover_scores_and_config_events():
+    assert any(run["score"] > 0 for run in RUNS)
+    assert any(kind == 1 for run in RUNS for _, kind, _, _ in decode_log(run["log"]).events)
+
+
+def test_js_runs_verify():
+    assert verify_runs([(run["log"], run["score"]) for run in RUNS]) == [True] * len(RUNS)
+
+
+def test_bumped_score_is_rejected():
+    assert verify_runs([(run["log"], run["score"] + 1) for run in RUNS]) == [False] * len(RUNS)
+
+
+def test_single_run_replay_matches_batch():
+    logs = [decode_log(run["log"]) for run in RUNS]
+    scores, frames, alive = replay_logs(logs)
+    assert [replay_one(log) for log in logs] == list(zip(scores.tolist(), frames.tolist(), alive.tolist()))
+    scored = next(run for run in RUNS if run["score"] > 0)
+    assert verify_runs([(scored["log"], scored["score"])]) == [True]
+
+
+def test_malformed_runs_are_rejected():
+    run = RUNS[0]
+    for message in (None, [], {}, dict(run, log=None), dict(run, log=7), dict(run, score=None),
+                    dict(run, score="3"), dict(run, score=True), dict(run, score=-1), dict(run, seed=None),
+                    dict(run, seed=run["seed"] + 1)):
+        with pytest.raises(ReplayError):
+            read_run(message)
+    assert verify_runs([(None, 0), (7, 0), (run["log"], None), (run["log"], str(run["score"]))]) == [False] * 4
+
+
+def test_runs_longer_than_their_score_allows_are_not_replayed():
+    log = decode_log(RUNS[0]["log"])
+    forged = log._replace(steps=MAX_STEPS)
+    assert max_steps(forged, RUNS[0]["score"]) < MAX_STEPS
+    assert verify_runs([(encode_log(forged), RUNS[0]["score"])]) == [False]
+    assert all(decode_log(run["log"]).steps <= max_steps(decode_log(run["log"]), run["score"]) for run in RUNS)
+
+
+def test_encode_round_trips_js_logs():
+    for run in RUNS:
+        log = decode_log(run["log"])
+        assert encode_log(log) == run["log"]
+        assert decode_log(encode_log(log)) == log
+
+
+def test_config_codes_match_js():
+    for run in RUNS:
+        codes = tuple(config_code(param, run["config"][param]) for param in CONFIG_PARAMS)
+        assert decode_log(run["log"]).config == codes
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_js_core_still_writes_the_fixtures():
+    # If this fails the game's physics or log format changed: check the
+    # Python sim still agrees, then regenerate the fixtures
+    script = os.path.join(FIXTURES, "js_runs.js")
+    out = subprocess.run(["node", script], check=True, capture_output=True, text=True, timeout=300).stdout
+    assert json.loads(out) == RUNS
+
+
+def test_reported_configs_are_checked():
+    assert read_config([3, 50, 12, 180]) == (3, 50, 12, 180)
+    for codes in (None, (3, 50, 12, 180), [3, 50, 12], [3, 0.5, 12, 180], [3, 50, 12, 999], [True, 50, 12, 180]):
+        with pytest.raises(ReplayError):
+            read_config(codes)
@@ -0,0 +1,28 @@
+"""Asset routes mounted by flappy_app.py."""
+import asyncio
+
+from starlette.requests import Request
+
+from flappy.serving import IMMUTABLE, STATIC_ROUTE, asset_routes
+
+
+def get(routes, name):
+    route, = routes
+    scope = {"type": "http", "method": "GET", "path": f"/{STATIC_ROUTE}{name}", "headers": [],
+             "query_string": b"", "path_params": {"name": name}}
+    return asyncio.run(route.endpoint(Request(scope)))
+
+
+def test_assets_are_served_immutable(tmp_path):
+    (tmp_path / "0123abcd.webp").write_bytes(b"RIFF")
+    response = get(asset_routes(str(tmp_path)), "0123abcd.webp")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["content-type"] == "image/webp"
+
+
+def test_missing_and_hidden_files_are_not_served(tmp_path):
+    (tmp_path / ".tmp-half-written").write_bytes(b"x")
+    routes = asset_routes(str(tmp_path))
+    assert get(routes, "gone.png").status_code == 404
+    assert get(routes, ".tmp-half-written").status_code == 404
@@ -0,0 +1,120 @@
+"""Game rules of the headless simulation, checked directly rather than through replays."""
+import numpy as np
+import pytest
+
+from flappy.sim import (
+    FLOOR_MARGIN, MARGIN_RATIO, PIPE_DESPAWN_MARGIN, PIPE_INTERVAL_MS, PLAYER_SIZE, PLAYER_X, GameBatch,
+    pipe_capacity,
+)
+
+HEIGHT = 600
+# A gap this wide is always centred on the screen and holds a player
+# floating at mid-height, so nothing ever hits a pipe
+SAFE_GAP = HEIGHT * (1 - 2 * MARGIN_RATIO)
+
+
+def floating(n=1, **kwargs):
+    return GameBatch(n, height=HEIGHT, gravity=0, pipe_gap=SAFE_GAP, seed=np.arange(1, n + 1), **kwargs)
+
+
+def test_pipes_spawn_every_interval():
+    batch = floating()
+    dt = 20  # 90 steps add up to exactly PIPE_INTERVAL_MS
+    steps = PIPE_INTERVAL_MS // dt
+    for _ in range(steps):
+        batch.step(dt)
+    # The timer has to pass the interval, not just reach it
+    assert batch.spawned[0] == 0
+    batch.step(dt)
+    assert batch.spawned[0] == 1
+    assert np.isfinite(batch.pipe_x[0]).sum() == 1
+    for _ in range(steps):
+        batch.step(dt)
+    assert batch.spawned[0] == 1
+    batch.step(dt)
+    assert batch.spawned[0] == 2
+    assert batch.alive.all()
+
+
+def one_pipe(batch, x):
+    batch.pipe_timer[:] = -np.inf  # no spawns
+    batch.pipe_x[:, 0] = x
+    batch.pipe_center[:, 0] = HEIGHT / 2
+    batch.pipe_scored[:, 0] = False
+
+
+def test_each_pipe_scores_once():
+    batch = floating()
+    one_pipe(batch, PLAYER_X - batch.pipe_width[0] + 5)
+    batch.step()
+    assert batch.score[0] == 0
+    for _ in range(20):
+        batch.step()
+    assert batch.score[0] == 1
+    assert batch.alive.all()
+
+
+def test_pipe_edge_kills():
+    batch = GameBatch(1, height=HEIGHT, gravity=0, pipe_gap=100)
+    one_pipe(batch, PLAYER_X + PLAYER_SIZE + 1)
+    batch.y[:] = HEIGHT / 2 - 60  # above the gap
+    for _ in range(5):
+        batch.step()
+    assert not batch.alive[0]
+    assert batch.score[0] == 0
+
+
+def test_floor_ends_the_game():
+    batch = GameBatch(2, height=HEIGHT)
+    floor = HEIGHT - FLOOR_MARGIN - PLAYER_SIZE
+    batch.y[:] = [floor - 0.2, floor - 20]
+    batch.vy[:] = 1
+    batch.step()
+    assert list(batch.alive) == [False, True]
+    assert list(batch.frames) == [1, 1]
+    # A finished game is not advanced any more
+    y = batch.y[0]
+    batch.step()
+    assert batch.y[0] == y and batch.frames[0] == 1
+
+
+def test_ceiling_stops_the_player():
+    batch = GameBatch(1, height=HEIGHT)
+    batch.y[:] = 5
+    batch.step(flap=np.array([True]))
+    assert batch.alive[0]
+    assert batch.y[0] == 0 and batch.vy[0] == 0
+
+
+def test_take_branches_games():
+    batch = GameBatch(2, height=HEIGHT, seed=[7, 8])
+    for _ in range(120):
+        batch.step(flap=batch.vy > 4)
+    batch.take([1, 0, 0])
+    assert batch.n == 3
+    assert list(batch.rows) == [0, 1, 2]
+    assert batch.y[1] == batch.y[2] and batch.spawned[1] == batch.spawned[2]
+    np.testing.assert_array_equal(batch.rng.state[1], batch.rng.state[2])
+    # Branches are independent copies: one flaps, the other does not
+    batch.step(flap=np.array([False, True, False]))
+    assert batch.y[1] < batch.y[2]
+    # and draw the same pipes from the shared PRNG state
+    np.testing.assert_array_equal(batch.uniform([1]), batch.uniform([2]))
+
+
+@pytest.mark.parametrize("speed", range(1, 11))
+@pytest.mark.parametrize("width", [300, 900])
+def test_ring_never_overwrites_a_live_pipe(speed, width):
+    capacity = pipe_capacity(width, speed)
+    batch = floating(width=width, game_speed=speed, capacity=capacity)
+    frames = int(3 * capacity * PIPE_INTERVAL_MS * 60 / 1000) + 60
+    for _ in range(frames):
+        slot = batch.spawned[0] % capacity
+        old = batch.pipe_x[0, slot]
+        spawned = batch.spawned[0]
+        batch.step()
+        if batch.spawned[0] > spawned:
+            # The browser drops a pipe once x + PIPE_DESPAWN_MARGIN < 0
+            assert old == np.inf or old + PIPE_DESPAWN_MARGIN < 0
+    assert batch.alive.all()
+    assert batch.spawned[0] > capacity
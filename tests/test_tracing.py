@@ -0,0 +1,84 @@
+"""Per-rerun traces: span nesting, the untraced no-op and what is kept."""
+import json
+
+import pytest
+
+from flappy import tracing
+from flappy.tracing import NULL_SPAN, Tracer
+
+
+@pytest.fixture(autouse=True)
+def untraced():
+    yield
+    # Never leave a trace open on the test thread
+    Tracer(always=False).start("reset")
+
+
+def test_sub_span_counts_add_up_in_the_parent():
+    tracer = Tracer()
+    trace = tracer.start("s", enabled=True)
+    with tracing.span("assets", role="all") as outer:
+        tracing.add(hits=1)
+        with tracing.span("image"):
+            tracing.add(bytes=100, misses=1)
+        with tracing.span("audio"):
+            tracing.add(bytes=50)
+    tracing.add(bytes=1)  # no span open: dropped
+    record = trace.finish()
+    assert outer.counts == {"hits": 1, "bytes": 150, "misses": 1}
+    assets, image, audio = record["spans"]
+    assert (assets["name"], assets["depth"], assets["role"]) == ("assets", 0, "all")
+    assert (image["depth"], image["bytes"], audio["bytes"]) == (1, 100, 50)
+    assert assets["bytes"] == 150 and assets["ms"] >= image["ms"] + audio["ms"]
+    assert image["start_ms"] <= audio["start_ms"]
+
+
+def test_untraced_spans_are_a_shared_no_op():
+    tracer = Tracer(always=False)
+    assert tracer.start("s") is NULL_SPAN
+    with tracing.span("assets") as span:
+        assert span is NULL_SPAN and not span
+        span.add(bytes=1)
+        tracing.add(bytes=1)
+    assert tracer.recent("s") == []
+
+
+def test_finishing_stops_tracing_the_thread():
+    Tracer().start("s", enabled=True).finish()
+    assert tracing.span("late") is NULL_SPAN
+
+
+def test_history_keeps_the_last_reruns():
+    tracer = Tracer(history=3)
+    for _ in range(5):
+        tracer.start("s", enabled=True).finish()
+    assert [record["rerun"] for record in tracer.recent("s")] == [5, 4, 3]
+
+
+def test_least_recent_sessions_are_evicted(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, "MAX_SESSIONS", 2)
+    for session in ("a", "b", "a", "c"):
+        tracer.start(session, enabled=True).finish()
+    assert tracer.recent("b") == []
+    assert [record["rerun"] for record in tracer.recent("a")] == [2, 1]
+    assert len(tracer.recent("c")) == 1
+
+
+def test_log_rotates(tmp_path):
+    path = tmp_path / "traces" / "trace.jsonl"
+    tracer = Tracer(log_path=str(path), always=True, max_bytes=400, backups=2)
+    for i in range(20):
+        trace = tracer.start(f"session-{i}")
+        with tracing.span("assets"):
+            tracing.add(bytes=i)
+        trace.finish()
+    files = sorted(p.name for p in path.parent.iterdir())
+    assert files == ["trace.jsonl", "trace.jsonl.1", "trace.jsonl.2"]
+    for name in files:
+        text = (path.parent / name).read_text(encoding="utf-8")
+        assert len(text) <= 400
+        for line in text.splitlines():
+            assert json.loads(line)["spans"][0]["name"] == "assets"
+    last = json.loads(path.read_text(encoding="utf-8").splitlines()[-1])
+    assert last["session"] == "session-19"
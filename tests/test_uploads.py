@@ -0,0 +1,59 @@
+"""The content-addressed upload store and the per-rerun upload swap."""
+import io
+import os
+
+from flappy.uploads import MAX_UPLOAD_MB, UploadStore, store_uploads
+
+
+class Upload(io.BytesIO):
+    """Stands in for Streamlit's UploadedFile."""
+
+    def __init__(self, data, name, file_id):
+        super().__init__(data)
+        self.name = name
+        self.file_id = file_id
+
+
+def stored_files(root):
+    return sorted(name for _, _, names in os.walk(root) for name in names)
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = UploadStore(str(tmp_path))
+    uploads = {"bg": Upload(b"same bytes", "a.png", "id-1"), "bag": Upload(b"same bytes", "b.png", "id-2")}
+    stored, digests, errors = store_uploads(uploads, store, known={})
+    assert not errors
+    assert digests["id-1"] == digests["id-2"]
+    assert stored["bg"].read() == b"same bytes"
+    assert len(stored_files(tmp_path)) == 1
+
+
+def test_uploads_over_the_limit_are_rejected_and_remembered(tmp_path, monkeypatch):
+    store = UploadStore(str(tmp_path))
+    big = Upload(b"\0" * (MAX_UPLOAD_MB * 1024 * 1024 + 1), "huge.mp3", "id-big")
+    uploads = {"menu": big, "player": [Upload(b"frame", "p.png", "id-frame"), big]}
+    stored, digests, errors = store_uploads(uploads, store, known={})
+    assert stored["menu"] is None
+    assert [frame.name for frame in stored["player"]] == ["p.png"]
+    assert f"{MAX_UPLOAD_MB} MB" in errors["id-big"]
+    assert list(digests) == ["id-frame"]
+    # Nothing of the rejected file is left behind, not even its temp file
+    assert stored_files(tmp_path) == [digests["id-frame"]]
+
+    def spool(fileobj):
+        raise AssertionError(f"{fileobj.name} spooled again")
+
+    monkeypatch.setattr(store, "ingest", spool)
+    stored, digests, again = store_uploads({"menu": big}, store, known={}, rejected=errors)
+    assert stored["menu"] is None
+    assert again == {"id-big": errors["id-big"]}
+
+
+def test_known_uploads_are_touched_not_read(tmp_path, monkeypatch):
+    store = UploadStore(str(tmp_path))
+    upload = Upload(b"sprite", "p.png", "id-1")
+    _, digests, _ = store_uploads({"player": upload}, store, known={})
+    monkeypatch.setattr(store, "ingest", lambda fileobj: None)
+    stored, again, _ = store_uploads({"player": upload}, store, known=digests)
+    assert again == digests
+    assert stored["player"].read() == b"sprite"